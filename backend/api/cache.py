@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.utils import timezone
+
+MISSING = object()
+# Журнал изменений хранится сутки; если записи вытеснены или их
+# слишком много, читатель перестраивает свои данные целиком.
+CHANGE_LOG_TIMEOUT = 60 * 60 * 24
+CHANGE_LOG_MAX_REPLAY = 1000
+
+invalidators = defaultdict(list)
+
+
+class CacheStats:
+    """Попадания и промахи кеша по пространствам имён."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def record(self, namespace, hit):
+        with self.lock:
+            (self.hits if hit else self.misses)[namespace] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return dict(self.hits), dict(self.misses)
+
+
+stats = CacheStats()
+
+
+def get_namespace(model):
+    """Пространство имён ключей модели: recipe, tag, follow и т.д."""
+    return model._meta.model_name
+
+
+def make_key(namespace, *parts):
+    return ":".join((namespace, *map(str, parts)))
+
+
+def get_cached(namespace, *parts, default=None):
+    """Читает значение из кеша и учитывает попадание или промах."""
+    value = cache.get(make_key(namespace, *parts), MISSING)
+    stats.record(namespace, value is not MISSING)
+    return default if value is MISSING else value
+
+
+def set_cached(namespace, *parts, value, timeout):
+    cache.set(make_key(namespace, *parts), value, timeout)
+
+
+def get_or_set_cached(namespace, *parts, compute, timeout):
+    """Возвращает значение из кеша, а при промахе вычисляет и сохраняет."""
+    value = get_cached(namespace, *parts, default=MISSING)
+    if value is MISSING:
+        value = compute()
+        set_cached(namespace, *parts, value=value, timeout=timeout)
+    return value
+
+
+def delete_cached(namespace, *keys):
+    cache.delete_many([make_key(namespace, key) for key in keys])
+
+
+def initial_counter():
+    """
+    Начальное значение счётчика. Если счётчик вытеснен из кеша,
+    он начнётся с большего числа, и старые ключи не оживут.
+    """
+    return time.time_ns() // 1000
+
+
+def get_version(name):
+    """Возвращает текущую версию набора данных."""
+    key = make_key(name, "version")
+    version = cache.get(key)
+    if version is not None:
+        return version
+    cache.add(key, initial_counter(), timeout=None)
+    return cache.get(key)
+
+
+def get_last_modified(name):
+    """Возвращает время последнего изменения набора данных."""
+    key = make_key(name, "modified")
+    modified = cache.get(key)
+    if modified is not None:
+        return modified
+    cache.add(key, timezone.now().replace(microsecond=0), timeout=None)
+    return cache.get(key)
+
+
+def bump_version(name):
+    """Увеличивает версию, чтобы закешированные данные устарели."""
+    cache.set(
+        make_key(name, "modified"),
+        timezone.now().replace(microsecond=0),
+        timeout=None,
+    )
+    key = make_key(name, "version")
+    cache.add(key, initial_counter(), timeout=None)
+    return cache.incr(key)
+
+
+def get_generations(namespace, scopes):
+    """
+    Возвращает поколения областей данных, например tag:breakfast
+    или author:5, одним обращением к кешу.
+    """
+    keys = {
+        scope: make_key(namespace, "generation", scope) for scope in scopes
+    }
+    generations = cache.get_many(keys.values())
+    missing = {
+        key: initial_counter()
+        for key in keys.values()
+        if key not in generations
+    }
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        generations.update(cache.get_many(missing))
+    return {scope: generations.get(key) for scope, key in keys.items()}
+
+
+def bump_generations(namespace, scopes):
+    """
+    Увеличивает поколения областей: устаревают только ответы,
+    которые от них зависят, а не весь кеш пространства имён.
+    """
+    for scope in set(scopes):
+        key = make_key(namespace, "generation", scope)
+        cache.add(key, initial_counter(), timeout=None)
+        cache.incr(key)
+
+
+def log_change(name, item):
+    """Добавляет запись в журнал изменений name, например id рецепта."""
+    key = make_key(name, "changes")
+    cache.add(key, initial_counter(), timeout=None)
+    position = cache.incr(key)
+    cache.set(
+        make_key(name, "change", position), item, timeout=CHANGE_LOG_TIMEOUT
+    )
+
+
+def reset_changes(name):
+    """
+    Сдвигает журнал изменений name дальше, чем читатели могут
+    воспроизвести: вместо записей они получат None и перестроят данные.
+    """
+    key = make_key(name, "changes")
+    cache.add(key, initial_counter(), timeout=None)
+    cache.incr(key, CHANGE_LOG_MAX_REPLAY + 1)
+
+
+def get_changes(name, since):
+    """
+    Возвращает текущую позицию журнала и записи после since. Вместо
+    записей возвращается None, если их нельзя прочитать полностью:
+    тогда данные нужно построить заново.
+    """
+    key = make_key(name, "changes")
+    position = cache.get(key)
+    if position is None:
+        cache.add(key, initial_counter(), timeout=None)
+        position = cache.get(key)
+    if (
+        position is None
+        or since is None
+        or not 0 <= position - since <= CHANGE_LOG_MAX_REPLAY
+    ):
+        return position, None
+    keys = [
+        make_key(name, "change", index)
+        for index in range(since + 1, position + 1)
+    ]
+    changes = cache.get_many(keys)
+    if len(changes) < len(keys):
+        return position, None
+    return position, [changes[key] for key in keys]
+
+
+def invalidates(*models):
+    """
+    Регистрирует функцию, которая после коммита сбрасывает кеш,
+    зависящий от изменённого объекта. Функция получает объект.
+    """
+
+    def decorator(func):
+        for model in models:
+            invalidators[model].append(func)
+        return func
+
+    return decorator
+
+
+def invalidate(sender, instance, **kwargs):
+    handlers = list(invalidators[sender])
+
+    def run():
+        bump_version(get_namespace(sender))
+        for handler in handlers:
+            handler(instance)
+
+    transaction.on_commit(run)
+
+
+def watch(*models):
+    """
+    Подключает сброс кеша к сохранению и удалению моделей: версия
+    пространства имён модели увеличивается, затем вызываются функции,
+    зарегистрированные через invalidates.
+    """
+    for model in models:
+        uid = f"cache:{model._meta.label}"
+        post_save.connect(invalidate, sender=model, dispatch_uid=uid)
+        post_delete.connect(invalidate, sender=model, dispatch_uid=uid)
@@ -0,0 +1,93 @@
+import heapq
+from itertools import islice
+
+from django.conf import settings
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow, User
+
+BATCH_SIZE = 1000
+
+
+def is_fanned_out(author_id):
+    """
+    Рецепты автора раскладываются по лентам подписчиков, только пока
+    подписчиков меньше FEED_FANOUT_MAX_FOLLOWERS. Рецепты популярных
+    авторов добавляются в ленту при чтении.
+    """
+    return User.objects.filter(
+        pk=author_id,
+        followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    ).exists()
+
+
+def create_entries(entries):
+    """Сохраняет записи ленты из итератора пачками по BATCH_SIZE."""
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_recipe(recipe_id, author_id):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if not is_fanned_out(author_id):
+        return
+    followers = Follow.objects.filter(author_id=author_id).values_list(
+        "user_id", flat=True
+    )
+    create_entries(
+        TimelineEntry(
+            user_id=user_id, author_id=author_id, recipe_id=recipe_id
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def add_author_to_timeline(user_id, author_id):
+    """Добавляет в ленту нового подписчика рецепты автора."""
+    if not is_fanned_out(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).values_list(
+        "id", flat=True
+    )
+    create_entries(
+        TimelineEntry(user_id=user_id, author_id=author_id, recipe_id=pk)
+        for pk in recipes.iterator()
+    )
+
+
+def remove_author_from_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def get_feed_ids(user, limit, before=None):
+    """
+    id рецептов ленты, новые первыми: limit записей из ленты
+    пользователя, объединённых с последними рецептами популярных
+    авторов, на которых он подписан. Лента читается по индексу
+    (user, recipe) не дальше limit строк, сколько бы ни было подписок.
+    """
+    entries = TimelineEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(
+        author__following__user=user,
+        author__followers_count__gte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+    )
+    if before is not None:
+        entries = entries.filter(recipe_id__lt=before)
+        pulled = pulled.filter(id__lt=before)
+    streams = (
+        entries.order_by("-recipe_id").values_list("recipe_id", flat=True),
+        pulled.order_by("-id").values_list("id", flat=True),
+    )
+    ids = []
+    pages = (stream[:limit] for stream in streams)
+    for pk in heapq.merge(*pages, reverse=True):
+        if ids and ids[-1] == pk:
+            continue
+        ids.append(pk)
+        if len(ids) == limit:
+            break
+    return ids
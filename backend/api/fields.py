@@ -1,7 +1,81 @@
 import base64
+import binascii
+import string
+from contextlib import suppress
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile,
+    TemporaryUploadedFile,
+)
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from .images import get_image_url
+
+BASE64_MARKER = ";base64,"
+CHUNK_SIZE = 64 * 1024
+# Пробелы и переносы строк (например, через каждые 76 символов)
+# в base64 пропускаются, остальные символы вне алфавита — ошибка.
+WHITESPACE = string.whitespace
+REMOVE_WHITESPACE = str.maketrans("", "", WHITESPACE)
+
+
+def close_quietly(file):
+    """
+    Закрывает загруженный файл после сохранения рецепта. Хранилище
+    перемещает временный файл, и удалять при закрытии становится нечего.
+    """
+    if file is None:
+        return
+    with suppress(FileNotFoundError):
+        file.close()
+
+
+def decode_base64_file(data, offset, name, content_type):
+    """
+    Декодирует base64 кусками, не создавая полную копию картинки в
+    памяти. Размер проверяется до декодирования; большие файлы сразу
+    пишутся во временный файл на диске, как при обычной загрузке.
+    Временный файл закрывает сериалайзер после сохранения рецепта.
+    """
+    end = len(data)
+    while end > offset and data[end - 1] in WHITESPACE:
+        end -= 1
+    length = (end - offset) - sum(
+        data.count(char, offset, end) for char in WHITESPACE
+    )
+    size = length * 3 // 4 - data[end - 2:end].count("=")
+    if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise serializers.ValidationError(
+            "Картинка больше "
+            f"{settings.IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ."
+        )
+    if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+        file = TemporaryUploadedFile(name, content_type, size, None)
+    else:
+        file = InMemoryUploadedFile(
+            BytesIO(), None, name, content_type, size, None
+        )
+    try:
+        # Кусок без пробелов декодируется до кратной 4 длины, остаток
+        # переходит в следующий.
+        rest = ""
+        for start in range(offset, end, CHUNK_SIZE):
+            chunk = rest + data[start:start + CHUNK_SIZE].translate(
+                REMOVE_WHITESPACE
+            )
+            usable = len(chunk) - len(chunk) % 4
+            file.write(base64.b64decode(chunk[:usable], validate=True))
+            rest = chunk[usable:]
+        file.write(base64.b64decode(rest, validate=True))
+    except binascii.Error:
+        file.close()
+        raise serializers.ValidationError("Некорректная картинка.")
+    file.seek(0)
+    return file
 
 
 class Base64ImageField(serializers.ImageField):
@@ -9,7 +83,87 @@ class Base64ImageField(serializers.ImageField):
 
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith("data:image"):
-            format, imgstr = data.split(";base64,")
-            ext = format.split("/")[-1]
-            data = ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+            marker = data.find(BASE64_MARKER, 0, 64)
+            if marker == -1:
+                raise serializers.ValidationError("Некорректная картинка.")
+            content_type = data[len("data:"):marker]
+            ext = content_type.split("/")[-1]
+            data = decode_base64_file(
+                data, marker + len(BASE64_MARKER), "temp." + ext, content_type
+            )
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.Field):
+    "Ссылки на уменьшенные копии картинки рецепта по ширине."
+
+    def __init__(self, **kwargs):
+        kwargs["source"] = "*"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        request = self.context.get("request")
+        return {
+            str(size): get_image_url(recipe, size, request)
+            for size in settings.IMAGE_VARIANT_SIZES
+        }
+
+
+def get_objects(queryset, ids):
+    """
+    Достаёт объекты по id одним запросом и возвращает их вместе со
+    списком id, которых нет в базе.
+    """
+    objects = queryset.in_bulk(ids)
+    missing = [pk for pk in dict.fromkeys(ids) if pk not in objects]
+    return objects, missing
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список связанных объектов, который проверяется одним запросом."""
+
+    default_error_messages = {
+        "does_not_exist": "Не найдены объекты с id: {pk_value}.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, "__iter__"):
+            self.fail("not_a_list", input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail("empty")
+        queryset = self.child_relation.get_queryset()
+        ids = []
+        for value in data:
+            if isinstance(value, bool):
+                self.child_relation.fail(
+                    "incorrect_type", data_type=type(value).__name__
+                )
+            try:
+                ids.append(queryset.model._meta.pk.to_python(value))
+            except DjangoValidationError:
+                self.child_relation.fail(
+                    "incorrect_type", data_type=type(value).__name__
+                )
+        objects, missing = get_objects(queryset, ids)
+        if missing:
+            self.fail(
+                "does_not_exist",
+                pk_value=", ".join(str(pk) for pk in missing),
+            )
+        return [objects[pk] for pk in ids]
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField, который при many=True получает все
+    объекты одним запросом вместо запроса на каждый id.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
@@ -1,14 +1,31 @@
+from django.conf import settings
+from django.db.models import F
 from django_filters.rest_framework import FilterSet, filters
 from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import Ingredient, Recipe, Tag
 from users.models import User
 
+from .recipe_ingredients_index import recipe_ingredients_index
+from .search import search_recipes
+from .utils import filter_ranked
+
 
 class IngredientSearchFilter(SearchFilter):
     search_param = "name"
 
 
+RECIPE_ORDERINGS = {
+    "popular": (F("score__popular").desc(nulls_last=True),),
+    "trending": (F("score__trending").desc(nulls_last=True),),
+    "newest": ("-created_at",),
+    "cooking_time": ("cooking_time",),
+}
+# Аннотации релевантности фильтров search и ingredients. После явного
+# ordering рецепты сортируются по ним, затем по убыванию id.
+RECIPE_RANKS = ("rank", "ingredients_rank")
+
+
 class RecipeFilter(FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     is_favorited = filters.BooleanFilter(method="get_is_favorited")
@@ -21,6 +38,18 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method="get_is_in_shopping_cart"
     )
+    search = filters.CharFilter(method="get_search")
+    ingredients = filters.ModelMultipleChoiceFilter(
+        queryset=Ingredient.objects.only("id"), method="get_ingredients"
+    )
+    ingredients_match = filters.ChoiceFilter(
+        choices=(("all", "Все ингредиенты"), ("any", "Любой из ингредиентов")),
+        method="skip_filter",
+    )
+    ordering = filters.ChoiceFilter(
+        choices=[(name, name) for name in RECIPE_ORDERINGS],
+        method="skip_filter",
+    )
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         if value and not self.request.user.is_anonymous:
@@ -32,6 +61,47 @@ class RecipeFilter(FilterSet):
             return queryset.filter(favorite__user_id=self.request.user)
         return queryset
 
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ingredients(self, queryset, name, value):
+        if not value:
+            return queryset
+        ranks = recipe_ingredients_index.get_ranks(
+            [ingredient.pk for ingredient in value],
+            match_all=self.form.cleaned_data["ingredients_match"] != "any",
+        )
+        limit = settings.RECIPES_INGREDIENTS_LIMIT
+        if len(ranks) > limit:
+            # Остаются лучшие совпадения, а ответ сообщает об обрезке
+            # (RecipeViewSet.get_paginated_response).
+            self.request.ingredients_limit = limit
+            best = sorted(ranks, key=lambda pk: (-ranks[pk], -pk))[:limit]
+            ranks = {pk: ranks[pk] for pk in best}
+        return filter_ranked(queryset, ranks, "ingredients_rank")
+
+    def skip_filter(self, queryset, name, value):
+        # Режим ingredients_match учитывается в get_ingredients,
+        # ordering — в filter_queryset.
+        return queryset
+
+    def filter_queryset(self, queryset):
+        """
+        Порядок не зависит от того, в каком порядке объявлены фильтры:
+        сначала ordering из запроса, затем релевантность поиска и
+        совпадение ингредиентов, затем новые первыми.
+        """
+        queryset = super().filter_queryset(queryset)
+        ordering = RECIPE_ORDERINGS.get(self.form.cleaned_data["ordering"])
+        ranks = [
+            F(name).desc()
+            for name in RECIPE_RANKS
+            if name in queryset.query.annotations
+        ]
+        if ordering is None and not ranks:
+            return queryset
+        return queryset.order_by(*(ordering or ()), *ranks, "-id")
+
     class Meta:
         model = Recipe
         fields = ("author", "tags", "is_favorited", "is_in_shopping_cart")
@@ -0,0 +1,160 @@
+import io
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+
+from .cache import bump_generations, get_namespace
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"JPEG": "jpg", "WEBP": "webp"}
+VARIANT_NAME = re.compile(
+    r"^(?P<directory>.+)/variants/(?P<stem>[^/]+)_(?P<size>\d+)"
+    r"\.(?P<ext>\w+)$"
+)
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS, thread_name_prefix="images"
+)
+
+
+def get_extension():
+    return EXTENSIONS[settings.IMAGE_FORMAT]
+
+
+def variant_name(name, size):
+    """Путь к уменьшенной копии картинки рецепта."""
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(
+        directory, "variants", f"{stem}_{size}.{get_extension()}"
+    )
+
+
+def encode(image, size):
+    """Уменьшает картинку и пережимает её без метаданных и EXIF."""
+    image = image.copy()
+    image.thumbnail((size, size))
+    if settings.IMAGE_FORMAT == "JPEG" and image.mode != "RGB":
+        image = image.convert("RGB")
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        format=settings.IMAGE_FORMAT,
+        quality=settings.IMAGE_QUALITY,
+        optimize=True,
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def save_variants(image, name):
+    """Сохраняет уменьшенные копии для всех IMAGE_VARIANT_SIZES."""
+    variants = []
+    for size in settings.IMAGE_VARIANT_SIZES:
+        variant = variant_name(name, size)
+        default_storage.delete(variant)
+        variants.append(default_storage.save(variant, encode(image, size)))
+    return variants
+
+
+def process_recipe_image(recipe_id):
+    """
+    Поворачивает картинку по EXIF, уменьшает её, пережимает в
+    IMAGE_FORMAT и сохраняет уменьшенные копии.
+    """
+    try:
+        recipe = Recipe.objects.only("image", "author_id").get(pk=recipe_id)
+        original = recipe.image.name
+        with default_storage.open(original, "rb") as file:
+            with Image.open(file) as image:
+                image = ImageOps.exif_transpose(image)
+                image.load()
+        stem = os.path.splitext(original)[0]
+        name = default_storage.save(
+            f"{stem}.{get_extension()}",
+            encode(image, settings.IMAGE_MAX_SIZE),
+        )
+        variants = save_variants(image, name)
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=original
+        ).update(image=name, image_processed=True)
+        if not updated:
+            for stale in (name, *variants):
+                default_storage.delete(stale)
+            return
+        # update() не отправляет сигналов: закешированные ответы для
+        # анонимных пользователей ещё ссылаются на исходный файл.
+        bump_generations(
+            get_namespace(Recipe), ["all", f"author:{recipe.author_id}"]
+        )
+        if name != original:
+            default_storage.delete(original)
+    except Recipe.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception(
+            "Не удалось обработать картинку рецепта %s", recipe_id
+        )
+
+
+def render_variant(name):
+    """
+    Строит недостающую уменьшенную копию по её пути и сохраняет её
+    в MEDIA_ROOT, чтобы дальше файл отдавал веб-сервер.
+    """
+    match = VARIANT_NAME.match(name)
+    if match is None or match["ext"] != get_extension():
+        return None
+    size = int(match["size"])
+    if size not in settings.IMAGE_VARIANT_SIZES:
+        return None
+    original = (
+        Recipe.objects.filter(
+            image__startswith=f"{match['directory']}/{match['stem']}.",
+            image_processed=True,
+        )
+        .values_list("image", flat=True)
+        .first()
+    )
+    if original is None:
+        return None
+    if default_storage.exists(name):
+        with default_storage.open(name, "rb") as file:
+            return file.read()
+    with default_storage.open(original, "rb") as file:
+        with Image.open(file) as image:
+            content = encode(image, size)
+    default_storage.save(name, content)
+    content.seek(0)
+    return content.read()
+
+
+def get_image_url(recipe, size=None, request=None):
+    """Ссылка на картинку рецепта или на её уменьшенную копию."""
+    name = recipe.image.name
+    if size is not None and recipe.image_processed:
+        name = variant_name(name, size)
+    url = default_storage.url(name)
+    if request is None:
+        return url
+    return request.build_absolute_uri(url)
+
+
+def process_in_worker(recipe_id):
+    try:
+        process_recipe_image(recipe_id)
+    finally:
+        connection.close()
+
+
+def schedule_image_processing(recipe_id):
+    return executor.submit(process_in_worker, recipe_id)
@@ -0,0 +1,77 @@
+import threading
+from bisect import bisect_left
+
+from recipes.models import Ingredient
+
+from .cache import get_version
+
+VERSION_NAME = "ingredient"
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса.
+
+    Названия хранятся отсортированными, поэтому поиск по началу
+    названия — это бинарный поиск, а совпадения внутри названия
+    добираются линейным проходом по уже загруженному списку.
+    Индекс строится при первом обращении и перестраивается, когда
+    сигналы модели Ingredient меняют версию в кеше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Версия, ключи и ингредиенты публикуются одним кортежем:
+        # запрос во время перестройки видит либо старый индекс, либо
+        # новый, но не ключи одного с ингредиентами другого. Начальная
+        # версия не совпадает ни с одной версией из кеша.
+        self._snapshot = (object(), (), ())
+
+    def _build(self, version):
+        rows = Ingredient.objects.values(
+            "id", "name", "measurement_unit"
+        ).order_by("name", "id")
+        items = tuple(sorted(rows, key=lambda item: item["name"].lower()))
+        keys = tuple(item["name"].lower() for item in items)
+        return version, keys, items
+
+    def _ensure_built(self):
+        """Возвращает снимок (версия, ключи, ингредиенты) индекса."""
+        version = get_version(VERSION_NAME)
+        snapshot = self._snapshot
+        if snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot[0] != version:
+                    snapshot = self._build(version)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def all(self):
+        return list(self._ensure_built()[2])
+
+    def search(self, query, limit=None):
+        """Сначала совпадения по началу названия, затем по подстроке."""
+        _, keys, items = self._ensure_built()
+        query = query.strip().lower()
+        if not query:
+            return list(items[:limit])
+        result = []
+        start = bisect_left(keys, query)
+        index = start
+        while index < len(keys) and keys[index].startswith(query):
+            if limit is not None and len(result) >= limit:
+                return result
+            result.append(items[index])
+            index += 1
+        for position, key in enumerate(keys):
+            if limit is not None and len(result) >= limit:
+                break
+            if start <= position < index:
+                continue
+            if query in key:
+                result.append(items[position])
+        return result
+
+
+ingredient_index = IngredientIndex()
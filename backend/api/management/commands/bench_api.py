@@ -0,0 +1,294 @@
+import json
+import math
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+
+import requests
+from django.core.management import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+
+from api.images import executor
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.seed import get_image
+from users.models import User
+
+BENCH_RECIPE_NAME = "Рецепт для нагрузочного теста"
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга, values отсортированы."""
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class InProcessClient:
+    """Запросы через WSGI-обработчик Django в том же процессе."""
+
+    def __init__(self, token):
+        self.client = Client(
+            raise_request_exception=False,
+            HTTP_AUTHORIZATION=f"Token {token}",
+        )
+
+    def request(self, method, path, data):
+        send = getattr(self.client, method.lower())
+        if data is None:
+            response = send(path)
+        else:
+            response = send(
+                path, json.dumps(data), content_type="application/json"
+            )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        return response.status_code
+
+
+class HttpClient:
+    """Запросы к запущенному серверу, например gunicorn."""
+
+    def __init__(self, token, url):
+        self.url = url.rstrip("/")
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Token {token}"
+
+    def request(self, method, path, data):
+        response = self.session.request(
+            method, f"{self.url}{path}", json=data
+        )
+        return response.status_code
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест API на данных из generate_data: p50/p95/p99 "
+        "и запросы в секунду по каждому эндпоинту, сравнение с "
+        "сохранёнными результатами."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help=(
+                "Адрес запущенного сервера, например http://127.0.0.1:8000. "
+                "Без него запросы идут в приложение в этом процессе."
+            ),
+        )
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--endpoint",
+            action="append",
+            help="Запустить только указанные эндпоинты.",
+        )
+        parser.add_argument("--output", help="Куда сохранить результаты.")
+        parser.add_argument(
+            "--baseline", help="Результаты, с которыми сравнивать."
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=10,
+            help="Допустимое ухудшение p95 и RPS в процентах.",
+        )
+
+    def get_user(self):
+        user = (
+            User.objects.filter(
+                follower__isnull=False,
+                favorite__isnull=False,
+                shopping_cart__isnull=False,
+            )
+            .order_by("id")
+            .first()
+        )
+        if user is None:
+            raise CommandError(
+                "Нет данных для теста, сначала запустите generate_data."
+            )
+        return user
+
+    def get_endpoints(self):
+        """Эндпоинты теста: имя, метод, адрес и тело запроса."""
+        tags = list(Tag.objects.values_list("slug", flat=True)[:2])
+        author = Recipe.objects.values_list("author", flat=True).first()
+        ingredients = list(Ingredient.objects.values_list("id", "name")[:10])
+        recipe = {
+            "name": BENCH_RECIPE_NAME,
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": get_image(),
+            "tags": list(Tag.objects.values_list("id", flat=True)[:2]),
+            "ingredients": [
+                {"id": ingredient, "amount": 10}
+                for ingredient, _ in ingredients
+            ],
+        }
+        return (
+            ("recipes", "GET", "/api/recipes/", None),
+            ("recipes_tag", "GET", f"/api/recipes/?tags={tags[0]}", None),
+            (
+                "recipes_tags",
+                "GET",
+                f"/api/recipes/?tags={tags[0]}&tags={tags[1]}",
+                None,
+            ),
+            ("recipes_author", "GET", f"/api/recipes/?author={author}", None),
+            ("recipes_favorited", "GET", "/api/recipes/?is_favorited=1", None),
+            (
+                "recipes_in_cart",
+                "GET",
+                "/api/recipes/?is_in_shopping_cart=1",
+                None,
+            ),
+            (
+                "recipes_all_filters",
+                "GET",
+                f"/api/recipes/?tags={tags[0]}&is_favorited=1"
+                f"&is_in_shopping_cart=1",
+                None,
+            ),
+            (
+                "recipes_cursor",
+                "GET",
+                "/api/recipes/?cursor=&limit=6",
+                None,
+            ),
+            (
+                "subscriptions",
+                "GET",
+                "/api/users/subscriptions/?recipes_limit=3",
+                None,
+            ),
+            (
+                "download_shopping_cart",
+                "GET",
+                "/api/recipes/download_shopping_cart/",
+                None,
+            ),
+            (
+                "download_shopping_cart_pdf",
+                "GET",
+                "/api/recipes/download_shopping_cart/?file_format=pdf",
+                None,
+            ),
+            (
+                "ingredient_search",
+                "GET",
+                f"/api/ingredients/?name={ingredients[0][1][:2]}",
+                None,
+            ),
+            ("recipe_create", "POST", "/api/recipes/", recipe),
+        )
+
+    def measure(self, make_client, method, path, data, options):
+        local = threading.local()
+
+        def call(_):
+            client = getattr(local, "client", None)
+            if client is None:
+                client = local.client = make_client()
+            started = time.perf_counter()
+            status = client.request(method, path, data)
+            return time.perf_counter() - started, status
+
+        with ThreadPoolExecutor(options["concurrency"]) as pool:
+            list(pool.map(call, range(options["warmup"])))
+            started = time.perf_counter()
+            results = list(pool.map(call, range(options["requests"])))
+            elapsed = time.perf_counter() - started
+        durations = sorted(duration for duration, _ in results)
+        return {
+            "method": method,
+            "path": path,
+            "requests": len(results),
+            "errors": sum(status >= 400 for _, status in results),
+            "p50_ms": round(percentile(durations, 50) * 1000, 2),
+            "p95_ms": round(percentile(durations, 95) * 1000, 2),
+            "p99_ms": round(percentile(durations, 99) * 1000, 2),
+            "rps": round(len(results) / elapsed, 1),
+        }
+
+    def compare(self, results, baseline, threshold):
+        regressions = []
+        for name, result in results.items():
+            previous = baseline.get(name)
+            if previous is None:
+                continue
+            p95 = (result["p95_ms"] / previous["p95_ms"] - 1) * 100
+            rps = (result["rps"] / previous["rps"] - 1) * 100
+            self.stdout.write(
+                f"{name:28} p95 {previous['p95_ms']:>8} -> "
+                f"{result['p95_ms']:>8} ms ({p95:+.1f}%), "
+                f"rps {previous['rps']:>7} -> {result['rps']:>7} "
+                f"({rps:+.1f}%)"
+            )
+            if p95 > threshold or rps < -threshold:
+                regressions.append(name)
+        return regressions
+
+    def handle(self, *args, **options):
+        user = self.get_user()
+        token = Token.objects.get_or_create(user=user)[0].key
+        if options["url"]:
+            def make_client():
+                return HttpClient(token, options["url"])
+        else:
+            def make_client():
+                return InProcessClient(token)
+        endpoints = [
+            endpoint
+            for endpoint in self.get_endpoints()
+            if not options["endpoint"] or endpoint[0] in options["endpoint"]
+        ]
+        results = {}
+        with ExitStack() as stack:
+            if not options["url"]:
+                media = stack.enter_context(tempfile.TemporaryDirectory())
+                stack.enter_context(
+                    override_settings(MEDIA_ROOT=media, ALLOWED_HOSTS=["*"])
+                )
+            try:
+                for name, method, path, data in endpoints:
+                    results[name] = self.measure(
+                        make_client, method, path, data, options
+                    )
+                    result = results[name]
+                    self.stdout.write(
+                        f"{name:28} p50 {result['p50_ms']:>8} ms  "
+                        f"p95 {result['p95_ms']:>8} ms  "
+                        f"p99 {result['p99_ms']:>8} ms  "
+                        f"{result['rps']:>7} rps  "
+                        f"ошибок {result['errors']}"
+                    )
+            finally:
+                if not options["url"]:
+                    executor.shutdown(wait=True)
+                Recipe.objects.filter(
+                    author=user, name=BENCH_RECIPE_NAME
+                ).delete()
+        report = {
+            "mode": options["url"] or "in-process",
+            "requests": options["requests"],
+            "concurrency": options["concurrency"],
+            "endpoints": results,
+        }
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)["endpoints"]
+            regressions = self.compare(
+                results, baseline, options["threshold"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Результаты хуже базовых: " + ", ".join(regressions)
+                )
+        self.stdout.write(self.style.SUCCESS("Done!"))
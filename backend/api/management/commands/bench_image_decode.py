@@ -0,0 +1,70 @@
+import base64
+import os
+import time
+import tracemalloc
+
+from django.core.files.base import ContentFile
+from django.core.management import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.fields import BASE64_MARKER, decode_base64_file
+
+
+def decode_in_memory(data):
+    """Прежний способ: split и b64decode всей строки."""
+    format, imgstr = data.split(BASE64_MARKER)
+    ext = format.split("/")[-1]
+    return ContentFile(base64.b64decode(imgstr), name="temp." + ext)
+
+
+def decode_streaming(data):
+    marker = data.find(BASE64_MARKER)
+    return decode_base64_file(
+        data, marker + len(BASE64_MARKER), "temp.jpg", "image/jpeg"
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пиковую память и время декодирования base64 "
+        "картинки прежним и потоковым способом."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--size",
+            type=float,
+            default=4,
+            help="Размер картинки в мегабайтах.",
+        )
+
+    def measure(self, decode, data):
+        tracemalloc.start()
+        started = time.perf_counter()
+        file = decode(data)
+        elapsed = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        file.close()
+        return peak, elapsed
+
+    def handle(self, *args, **options):
+        payload = os.urandom(int(options["size"] * 1024 * 1024))
+        data = (
+            "data:image/jpeg" + BASE64_MARKER
+            + base64.b64encode(payload).decode("ascii")
+        )
+        del payload
+        for title, decode in (
+            ("Прежний", decode_in_memory),
+            ("Потоковый", decode_streaming),
+        ):
+            try:
+                peak, elapsed = self.measure(decode, data)
+            except ValidationError as error:
+                tracemalloc.stop()
+                raise CommandError(error.detail[0])
+            self.stdout.write(
+                f"{title}: пик памяти {peak / (1024 * 1024):.2f} МБ, "
+                f"{elapsed * 1000:.1f} мс"
+            )
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management import BaseCommand
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import IngredientSearchFilter
+from api.ingredient_index import ingredient_index
+from api.views import IngredientViewSet
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает поиск ингредиентов через IngredientSearchFilter "
+        "и через индекс в памяти."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat",
+            type=int,
+            default=20,
+            help="Сколько раз повторить каждый запрос.",
+        )
+
+    def get_queries(self):
+        names = Ingredient.objects.values_list("name", flat=True)
+        queries = set()
+        for name in names[:200]:
+            queries.update(name[:length] for length in (1, 2, 3, 5))
+        return sorted(queries)
+
+    def measure(self, queries, repeat, search):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                search(query)
+        return (time.perf_counter() - started) / (repeat * len(queries))
+
+    def handle(self, *args, **options):
+        queries = self.get_queries()
+        if not queries:
+            self.stdout.write(self.style.ERROR("Нет ингредиентов в базе."))
+            return
+        factory = APIRequestFactory()
+        view = IngredientViewSet()
+        search_filter = IngredientSearchFilter()
+
+        def filter_search(query):
+            request = Request(
+                factory.get("/api/ingredients/", {"name": query})
+            )
+            return list(
+                search_filter.filter_queryset(
+                    request, Ingredient.objects.all(), view
+                ).values("id", "name", "measurement_unit")
+            )
+
+        ingredient_index.all()
+        results = (
+            ("IngredientSearchFilter", filter_search),
+            ("IngredientIndex", ingredient_index.search),
+        )
+        repeat = options["repeat"]
+        for title, search in results:
+            seconds = self.measure(queries, repeat, search)
+            self.stdout.write(
+                f"{title}: {seconds * 1_000_000:.1f} мкс на запрос "
+                f"({len(queries)} запросов x {repeat})"
+            )
@@ -0,0 +1,29 @@
+from django.core.management import BaseCommand
+
+from api.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        "Обрабатывает картинки рецептов, которые не успел обработать "
+        "фоновый пул (например, после перезапуска сервера)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Обработать заново картинки всех рецептов.",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.exclude(image="")
+        if not options["all"]:
+            recipes = recipes.filter(image_processed=False)
+        recipe_ids = list(recipes.values_list("id", flat=True))
+        for recipe_id in recipe_ids:
+            process_recipe_image(recipe_id)
+        self.stdout.write(
+            self.style.SUCCESS(f"Done! Обработано: {len(recipe_ids)}.")
+        )
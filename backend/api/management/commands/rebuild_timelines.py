@@ -0,0 +1,55 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from api.feed import create_entries
+from recipes.models import Recipe, TimelineEntry
+from users.models import Follow
+
+
+class Command(BaseCommand):
+    help = (
+        "Заново заполняет ленты подписчиков по подпискам и рецептам. "
+        "Нужна после первого развёртывания ленты, после загрузки данных "
+        "в обход сигналов и когда у автора стало меньше "
+        "FEED_FANOUT_MAX_FOLLOWERS подписчиков."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            help="Перестроить ленты только указанных пользователей.",
+        )
+
+    def handle(self, *args, **options):
+        entries = TimelineEntry.objects.all()
+        follows = Follow.objects.filter(
+            author__followers_count__lt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        )
+        if options["user"]:
+            entries = entries.filter(user_id__in=options["user"])
+            follows = follows.filter(user_id__in=options["user"])
+        followers = defaultdict(list)
+        for user_id, author_id in follows.values_list("user_id", "author_id"):
+            followers[author_id].append(user_id)
+        recipes = Recipe.objects.filter(
+            author_id__in=follows.values("author_id")
+        ).values_list("author_id", "id")
+        with transaction.atomic():
+            entries.delete()
+            create_entries(
+                TimelineEntry(
+                    user_id=user_id, author_id=author_id, recipe_id=recipe_id
+                )
+                for author_id, recipe_id in recipes.iterator()
+                for user_id in followers[author_id]
+            )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Done! Записей в лентах: {entries.count()}."
+            )
+        )
@@ -0,0 +1,160 @@
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextvars import ContextVar
+
+from .cache import stats as cache_stats
+
+current_metrics = ContextVar("request_metrics", default=None)
+
+IN_LIST = re.compile(r"\bIN \((?:\?, )*\?\)", re.IGNORECASE)
+LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b|%s")
+SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    Приводит запрос к виду без параметров, чтобы одинаковые запросы
+    с разными id считались одним: так видны N+1.
+    """
+    sql = LITERAL.sub("?", sql)
+    sql = IN_LIST.sub("IN (...)", sql)
+    return SPACES.sub(" ", sql).strip()
+
+
+class RequestMetrics:
+    """Счётчики одного запроса: SQL, сериализация и общее время."""
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializing = False
+        self.fingerprints = Counter()
+        self.fingerprint_time = defaultdict(float)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            key = fingerprint(sql)
+            self.queries += 1
+            self.db_time += duration
+            self.fingerprints[key] += 1
+            self.fingerprint_time[key] += duration
+
+    def top_queries(self, limit):
+        return [
+            (count, self.fingerprint_time[key], key)
+            for key, count in self.fingerprints.most_common(limit)
+        ]
+
+
+class TimedSerializerMixin:
+    """
+    Считает время сериализации ответа. Вложенные сериалайзеры
+    не учитываются повторно: время идёт только внешнему вызову.
+    """
+
+    def to_representation(self, instance):
+        metrics = current_metrics.get()
+        if metrics is None or metrics.serializing:
+            return super().to_representation(instance)
+        metrics.serializing = True
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics.serializing = False
+
+
+class Registry:
+    """
+    Накопленные метрики по маршрутам в формате Prometheus.
+
+    Данные живут в памяти процесса: при нескольких воркерах gunicorn
+    каждый воркер отдаёт свои значения.
+    """
+
+    FIELDS = (
+        (
+            "requests_total",
+            "counter",
+            "Количество запросов.",
+        ),
+        (
+            "slow_requests_total",
+            "counter",
+            "Количество медленных запросов.",
+        ),
+        (
+            "db_queries_total",
+            "counter",
+            "Количество SQL-запросов.",
+        ),
+        (
+            "db_duration_seconds_total",
+            "counter",
+            "Время в базе данных.",
+        ),
+        (
+            "serializer_duration_seconds_total",
+            "counter",
+            "Время сериализации ответов.",
+        ),
+        (
+            "request_duration_seconds_total",
+            "counter",
+            "Общее время обработки запросов.",
+        ),
+    )
+
+    def __init__(self, prefix="foodgram"):
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.routes = defaultdict(lambda: dict.fromkeys(self.names(), 0))
+
+    def names(self):
+        return [name for name, _, _ in self.FIELDS]
+
+    def observe(self, route, method, status, metrics, total, slow):
+        with self.lock:
+            values = self.routes[(route, method, status)]
+            values["requests_total"] += 1
+            values["slow_requests_total"] += int(slow)
+            values["db_queries_total"] += metrics.queries
+            values["db_duration_seconds_total"] += metrics.db_time
+            values["serializer_duration_seconds_total"] += (
+                metrics.serializer_time
+            )
+            values["request_duration_seconds_total"] += total
+
+    def render(self):
+        with self.lock:
+            routes = {key: dict(values) for key, values in self.routes.items()}
+        lines = []
+        for name, kind, help_text in self.FIELDS:
+            metric = f"{self.prefix}_{name}"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            for (route, method, status), values in sorted(routes.items()):
+                labels = (
+                    f'route="{route}",method="{method}",status="{status}"'
+                )
+                lines.append(f"{metric}{{{labels}}} {values[name]}")
+        lines.extend(self.render_cache())
+        return "\n".join(lines) + "\n"
+
+    def render_cache(self):
+        for name, values in zip(("hits", "misses"), cache_stats.snapshot()):
+            metric = f"{self.prefix}_cache_{name}_total"
+            yield f"# TYPE {metric} counter"
+            for namespace, value in sorted(values.items()):
+                yield f'{metric}{{namespace="{namespace}"}} {value}'
+
+
+registry = Registry()
@@ -0,0 +1,83 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from .metrics import RequestMetrics, current_metrics, registry
+
+logger = logging.getLogger(__name__)
+
+
+def get_route(request):
+    """Имя маршрута вида RecipeViewSet.list, без id из адреса."""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    view = getattr(match.func, "cls", None)
+    actions = getattr(match.func, "actions", None)
+    if view is not None and actions:
+        action = actions.get(request.method.lower(), request.method.lower())
+        return f"{view.__name__}.{action}"
+    return match.view_name or match.route
+
+
+class QueryMetricsMiddleware:
+    """
+    Считает SQL-запросы, время в базе, время сериализации и общее
+    время каждого запроса.
+
+    Включается настройкой REQUEST_METRICS_ENABLED. Результат
+    отдаётся в заголовке Server-Timing, копится для /metrics, а для
+    запросов дольше REQUEST_METRICS_SLOW_MS в лог пишутся самые
+    частые запросы к базе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total = time.perf_counter() - start
+        route = get_route(request)
+        slow = total * 1000 >= settings.REQUEST_METRICS_SLOW_MS
+        registry.observe(
+            route, request.method, response.status_code, metrics, total, slow
+        )
+        response["Server-Timing"] = (
+            f'db;dur={metrics.db_time * 1000:.1f};'
+            f'desc="{metrics.queries} queries", '
+            f"serializer;dur={metrics.serializer_time * 1000:.1f}, "
+            f"total;dur={total * 1000:.1f}"
+        )
+        if slow:
+            self.log_slow_request(request, route, metrics, total)
+        return response
+
+    def log_slow_request(self, request, route, metrics, total):
+        top = "\n".join(
+            f"  {count} x {duration * 1000:.1f} ms: {sql}"
+            for count, duration, sql in metrics.top_queries(
+                settings.REQUEST_METRICS_TOP_QUERIES
+            )
+        )
+        logger.warning(
+            "Медленный запрос %s %s (%s): %.1f ms, %s SQL за %.1f ms\n%s",
+            request.method,
+            request.get_full_path(),
+            route,
+            total * 1000,
+            metrics.queries,
+            metrics.db_time * 1000,
+            top,
+        )
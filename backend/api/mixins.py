@@ -0,0 +1,173 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from .cache import (
+    get_cached,
+    get_generations,
+    get_last_modified,
+    get_namespace,
+    get_version,
+    make_key,
+    set_cached,
+)
+
+
+class VersionedCacheMixin:
+    """
+    Кеширует ответы list и retrieve справочных вьюсетов.
+
+    Ключ кеша и ETag строятся из версии пространства имён модели,
+    которую увеличивают сигналы, поэтому после изменения данных старые
+    ответы просто перестают использоваться. На If-None-Match и
+    If-Modified-Since отвечает 304 без обращения к базе.
+    """
+
+    cache_namespace = None
+
+    def get_cache_namespace(self):
+        return self.cache_namespace or get_namespace(self.queryset.model)
+
+    def get_cache_parts(self, request):
+        namespace = self.get_cache_namespace()
+        return ("response", get_version(namespace), request.get_full_path())
+
+    def get_etag(self, request, *args, **kwargs):
+        key = make_key(
+            self.get_cache_namespace(), *self.get_cache_parts(request)
+        )
+        return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+    def get_last_modified(self, request, *args, **kwargs):
+        return get_last_modified(self.get_cache_namespace())
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        @condition(
+            etag_func=self.get_etag,
+            last_modified_func=self.get_last_modified,
+        )
+        def view(request, *args, **kwargs):
+            namespace = self.get_cache_namespace()
+            parts = self.get_cache_parts(request)
+            data = get_cached(namespace, *parts)
+            if data is not None:
+                return Response(data)
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                set_cached(
+                    namespace,
+                    *parts,
+                    value=response.data,
+                    timeout=settings.REFERENCE_CACHE_TIMEOUT,
+                )
+            return response
+
+        return view(request, *args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+
+class AnonymousCacheMixin:
+    """
+    Кеширует ответы list и retrieve для анонимных пользователей: у них
+    нет избранного и корзины, и ответ зависит только от параметров.
+
+    Ключ строится из отсортированных параметров и поколений областей,
+    от которых зависит состав списка: тегов из ?tags, автора из ?author
+    или всех рецептов, если фильтров нет. Вместе с ответом хранятся
+    поколения авторов, чьи рецепты в него попали: изменение рецепта или
+    профиля автора делает устаревшими только такие ответы.
+    """
+
+    anonymous_cache_params = (
+        "tags",
+        "author",
+        "search",
+        "ingredients",
+        "ingredients_match",
+        "ordering",
+        "page",
+        "limit",
+        "cursor",
+    )
+    anonymous_cache_reference = ("tag", "ingredient")
+
+    def get_list_scopes(self, params):
+        scopes = [f"tag:{slug}" for slug in params.get("tags", ())]
+        scopes += [f"author:{pk}" for pk in params.get("author", ())]
+        scopes = scopes or ["all"]
+        if set(params.get("ordering", ())) & {"popular", "trending"}:
+            # Порядок меняет команда update_recipe_scores.
+            scopes.append("scores")
+        return scopes
+
+    def get_anonymous_cache_parts(self, request):
+        """Части ключа кеша или None, если ответ не кешируется."""
+        if not request.user.is_anonymous:
+            return None
+        params = {
+            key: sorted(set(values))
+            for key, values in request.query_params.lists()
+        }
+        if self.action == "retrieve":
+            if params:
+                return None
+            scopes, target = [], self.kwargs[self.lookup_field]
+        else:
+            if not params.keys() <= set(self.anonymous_cache_params):
+                return None
+            scopes = self.get_list_scopes(params)
+            target = urlencode(sorted(params.items()), doseq=True)
+        namespace = get_namespace(self.queryset.model)
+        generations = get_generations(namespace, scopes)
+        return (
+            "anonymous",
+            self.action,
+            *(get_version(name) for name in self.anonymous_cache_reference),
+            *(f"{scope}={value}" for scope, value in generations.items()),
+            target,
+        )
+
+    def get_response_authors(self, data):
+        recipes = data["results"] if self.action == "list" else [data]
+        return {f"author:{recipe['author']['id']}" for recipe in recipes}
+
+    def anonymous_cached_response(self, handler, request, *args, **kwargs):
+        parts = self.get_anonymous_cache_parts(request)
+        if parts is None:
+            return handler(request, *args, **kwargs)
+        namespace = get_namespace(self.queryset.model)
+        entry = get_cached(namespace, *parts)
+        if entry is not None:
+            authors, data = entry
+            if get_generations(namespace, authors) == authors:
+                return Response(data)
+        response = handler(request, *args, **kwargs)
+        if response.status_code == 200:
+            authors = self.get_response_authors(response.data)
+            set_cached(
+                namespace,
+                *parts,
+                value=(get_generations(namespace, authors), response.data),
+                timeout=settings.ANONYMOUS_CACHE_TIMEOUT,
+            )
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.anonymous_cached_response(
+            super().list, request, *args, **kwargs
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.anonymous_cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
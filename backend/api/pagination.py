@@ -1,6 +1,139 @@
-from rest_framework.pagination import PageNumberPagination
+from collections import OrderedDict
+
+from django.db import connection
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import (
+    BasePagination,
+    CursorPagination,
+    PageNumberPagination,
+)
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def estimate_count(queryset):
+    """
+    Оценка количества строк по статистике PostgreSQL. Для запросов
+    с фильтрами и других баз возвращает точное значение.
+    """
+    if connection.vendor != "postgresql" or queryset.query.where:
+        return queryset.count()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE relname = %s",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    if row is None or row[0] < 0:
+        return queryset.count()
+    return int(row[0])
 
 
 class LimitPageNumberPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = "limit"
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Пагинация по ключу: страница выбирается условием по id вместо
+    OFFSET, а общее количество считается только по запросу
+    (?count=exact или ?count=estimate).
+
+    Страницы всегда идут по убыванию id, поэтому запрос, уже
+    отсортированный иначе (ordering, релевантность search или
+    ingredients), отклоняется, а не пересортировывается молча.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    ordering = "-id"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if queryset.query.order_by not in ((), (self.ordering,)):
+            raise ValidationError(
+                {
+                    self.cursor_query_param: (
+                        "Пагинация по cursor идёт только по новизне, "
+                        "её нельзя сочетать с ordering, search "
+                        "и ingredients."
+                    )
+                }
+            )
+        count = request.query_params.get(self.count_query_param)
+        if count == "exact":
+            self.count = queryset.count()
+        elif count == "estimate":
+            self.count = estimate_count(queryset)
+        else:
+            self.count = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.count is not None:
+            response.data["count"] = self.count
+            response.data.move_to_end("count", last=False)
+        return response
+
+
+class OptionalCursorPagination(BasePagination):
+    """
+    Постраничная пагинация с параметром limit; если в запросе есть
+    параметр cursor (для первой страницы — пустой), включается
+    пагинация по ключу.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if LimitCursorPagination.cursor_query_param in request.query_params:
+            self.paginator = LimitCursorPagination()
+        else:
+            self.paginator = LimitPageNumberPagination()
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+
+class FeedPagination(BasePagination):
+    """
+    Пагинация ленты: следующая страница — рецепты с id меньше, чем
+    у последнего на текущей (?before=), размер страницы — limit.
+    """
+
+    page_size = 6
+    page_size_query_param = "limit"
+    before_query_param = "before"
+
+    def get_page_size(self, request):
+        value = request.query_params.get(self.page_size_query_param, "")
+        if value.isdigit() and int(value) > 0:
+            return int(value)
+        return self.page_size
+
+    def get_before(self, request):
+        value = request.query_params.get(self.before_query_param, "")
+        return int(value) if value.isdigit() else None
+
+    def paginate_ids(self, get_ids, request):
+        """Вызывает get_ids(limit, before) и возвращает id страницы."""
+        self.request = request
+        page_size = self.get_page_size(request)
+        ids = get_ids(page_size + 1, self.get_before(request))
+        self.next_before = ids[page_size - 1] if len(ids) > page_size else None
+        return ids[:page_size]
+
+    def get_next_link(self):
+        if self.next_before is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.before_query_param,
+            self.next_before,
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict([("next", self.get_next_link()), ("results", data)])
+        )
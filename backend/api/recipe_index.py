@@ -0,0 +1,152 @@
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from recipes.models import Recipe
+
+from .cache import get_namespace, get_version
+
+VERSION_NAME = get_namespace(Recipe)
+WORD = re.compile(r"\w+")
+STOP_WORDS = {
+    "а", "в", "во", "для", "до", "и", "из", "или", "к", "на", "не",
+    "о", "от", "по", "с", "со", "у",
+}
+# Окончания для упрощённого стемминга, длинные проверяются первыми.
+ENDINGS = sorted(
+    (
+        "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими", "ая",
+        "яя", "ое", "ее", "ые", "ие", "ый", "ий", "ой", "ей", "ую", "юю",
+        "ов", "ев", "ом", "ем", "ам", "ям", "ах", "ях", "а", "я", "о",
+        "е", "ы", "и", "у", "ю", "ь",
+    ),
+    key=len,
+    reverse=True,
+)
+MIN_STEM = 3
+NAME_WEIGHT = 2
+TEXT_WEIGHT = 1
+# Порог похожести по триграммам, как pg_trgm.similarity_threshold.
+SIMILARITY_THRESHOLD = 0.3
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[: -len(ending)]
+    return word
+
+
+def tokenize(text):
+    words = WORD.findall(text.lower().replace("ё", "е"))
+    return [stem(word) for word in words if word not in STOP_WORDS]
+
+
+def trigrams(term):
+    padded = f"  {term} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class RecipeIndex:
+    """
+    Обратный индекс рецептов в памяти процесса для баз без
+    полнотекстового поиска (SQLite в тестах и разработке).
+
+    Для каждой основы слова хранится вес в каждом рецепте: слова
+    из названия весят больше слов из описания. Основы слов проиндексированы
+    и по триграммам, поэтому слово с опечаткой заменяется похожими.
+    Индекс перестраивается, когда сигналы модели Recipe меняют версию
+    в кеше.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Версия, основы, триграммы и число рецептов публикуются одним
+        # кортежем, чтобы запрос во время перестройки не смешал данные
+        # старого и нового индекса.
+        self._snapshot = (object(), {}, {}, 0)
+
+    def _build(self, version):
+        postings = defaultdict(Counter)
+        count = 0
+        rows = Recipe.objects.values_list("id", "name", "text")
+        for pk, name, text in rows.iterator():
+            count += 1
+            for term in tokenize(name):
+                postings[term][pk] += NAME_WEIGHT
+            for term in tokenize(text):
+                postings[term][pk] += TEXT_WEIGHT
+        terms_by_trigram = defaultdict(set)
+        for term in postings:
+            for trigram in trigrams(term):
+                terms_by_trigram[trigram].add(term)
+        return version, dict(postings), dict(terms_by_trigram), count
+
+    def _ensure_built(self):
+        """Возвращает снимок (версия, основы, триграммы, число) индекса."""
+        version = get_version(VERSION_NAME)
+        snapshot = self._snapshot
+        if snapshot[0] != version:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot[0] != version:
+                    snapshot = self._build(version)
+                    self._snapshot = snapshot
+        return snapshot
+
+    def similar_terms(self, snapshot, term):
+        """Основы из индекса, похожие на term, и их похожесть."""
+        terms_by_trigram = snapshot[2]
+        grams = trigrams(term)
+        shared = Counter(
+            other
+            for gram in grams
+            for other in terms_by_trigram.get(gram, ())
+        )
+        result = {}
+        for other, common in shared.items():
+            similarity = common / (len(grams) + len(trigrams(other)) - common)
+            if similarity >= SIMILARITY_THRESHOLD:
+                result[other] = similarity
+        return result
+
+    def get_term_scores(self, snapshot, term):
+        _, postings, _, count = snapshot
+        variants = (
+            {term: 1.0}
+            if term in postings
+            else self.similar_terms(snapshot, term)
+        )
+        scores = Counter()
+        for variant, similarity in variants.items():
+            recipes = postings[variant]
+            idf = math.log(1 + count / len(recipes))
+            for pk, weight in recipes.items():
+                scores[pk] = max(scores[pk], weight * idf * similarity)
+        return scores
+
+    def get_scores(self, query):
+        """
+        Релевантность {id: вес} рецептов, в которых есть все слова
+        запроса.
+        """
+        snapshot = self._ensure_built()
+        scores = None
+        for term in set(tokenize(query)):
+            term_scores = self.get_term_scores(snapshot, term)
+            if scores is not None:
+                term_scores = Counter(
+                    {
+                        pk: score + scores[pk]
+                        for pk, score in term_scores.items()
+                        if pk in scores
+                    }
+                )
+            scores = term_scores
+            if not scores:
+                return {}
+        return dict(scores or {})
+
+
+recipe_index = RecipeIndex()
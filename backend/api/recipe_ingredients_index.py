@@ -0,0 +1,101 @@
+import threading
+from collections import Counter, defaultdict
+
+from recipes.models import IngredientRecipe
+
+from .cache import get_changes
+
+CHANGE_LOG_NAME = "recipe_ingredients"
+
+
+class RecipeIngredientsIndex:
+    """
+    Обратный индекс ингредиентов в памяти процесса: для ингредиента —
+    множество рецептов, для рецепта — множество его ингредиентов.
+
+    Рецепты со всеми ингредиентами запроса находятся пересечением
+    множеств, начиная с самого короткого, а не соединением таблицы
+    IngredientRecipe с собой по разу на ингредиент. Сигналы пишут id
+    изменённых рецептов в журнал в кеше, и индекс перечитывает только
+    их; если журнал неполный, индекс строится заново.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._position = None
+        self._recipes = defaultdict(set)
+        self._ingredients = {}
+
+    def _build(self, position):
+        recipes = defaultdict(set)
+        ingredients = defaultdict(set)
+        rows = IngredientRecipe.objects.values_list(
+            "recipe_id", "ingredient_id"
+        )
+        for recipe_id, ingredient_id in rows.iterator():
+            recipes[ingredient_id].add(recipe_id)
+            ingredients[recipe_id].add(ingredient_id)
+        self._recipes = recipes
+        self._ingredients = dict(ingredients)
+        self._position = position
+
+    def _update(self, position, recipe_ids):
+        ingredients = defaultdict(set)
+        rows = IngredientRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values_list("recipe_id", "ingredient_id")
+        for recipe_id, ingredient_id in rows:
+            ingredients[recipe_id].add(ingredient_id)
+        for recipe_id in recipe_ids:
+            for ingredient_id in self._ingredients.pop(recipe_id, ()):
+                self._recipes[ingredient_id].discard(recipe_id)
+            for ingredient_id in ingredients.get(recipe_id, ()):
+                self._recipes[ingredient_id].add(recipe_id)
+            if recipe_id in ingredients:
+                self._ingredients[recipe_id] = ingredients[recipe_id]
+        self._position = position
+
+    def _refresh(self):
+        position, changes = get_changes(CHANGE_LOG_NAME, self._position)
+        if position is not None and position == self._position:
+            return
+        if changes is None:
+            self._build(position)
+        else:
+            self._update(position, set(changes))
+
+    def get_ranks(self, ingredient_ids, match_all=True):
+        """
+        Ранги {id: ранг} рецептов с ингредиентами запроса: число
+        совпавших ингредиентов плюс 1 / (1 + число остальных). Ранг
+        выше там, где совпало больше, а при равенстве — где меньше
+        остальных ингредиентов; у многих рецептов ранги равны.
+        """
+        requested = set(ingredient_ids)
+        with self._lock:
+            self._refresh()
+            postings = sorted(
+                (self._recipes.get(pk, set()) for pk in requested), key=len
+            )
+            if not postings:
+                return {}
+            if match_all:
+                counts = dict.fromkeys(
+                    postings[0].intersection(*postings[1:]), len(requested)
+                )
+            else:
+                counts = Counter()
+                for recipes in postings:
+                    counts.update(recipes)
+            return {
+                pk: count + 1 / (1 + len(self._ingredients[pk]) - count)
+                for pk, count in counts.items()
+            }
+
+    def search(self, ingredient_ids, match_all=True, limit=None):
+        """id рецептов по убыванию ранга, при равенстве — новые первыми."""
+        ranks = self.get_ranks(ingredient_ids, match_all)
+        return sorted(ranks, key=lambda pk: (-ranks[pk], -pk))[:limit]
+
+
+recipe_ingredients_index = RecipeIngredientsIndex()
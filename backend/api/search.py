@@ -0,0 +1,41 @@
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    TrigramSimilarity,
+)
+from django.db import connection
+from django.db.models import F, Q
+
+from .recipe_index import recipe_index
+from .utils import filter_ranked
+
+SEARCH_CONFIG = "russian"
+
+
+def search_recipes(queryset, query):
+    """
+    Поиск рецептов по названию и описанию. Релевантность добавляется
+    аннотацией rank, чем больше, тем лучше.
+
+    В PostgreSQL запрос ищется в search_vector с русской морфологией,
+    а названия с опечатками находятся по триграммам pg_trgm. В других
+    базах используется индекс в памяти api.recipe_index. Число
+    найденных рецептов, как и в PostgreSQL, не ограничено.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+    if connection.vendor == "postgresql":
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type="websearch"
+        )
+        return (
+            queryset.filter(
+                Q(search_vector=search_query) | Q(name__trigram_similar=query)
+            )
+            .annotate(
+                rank=SearchRank(F("search_vector"), search_query)
+                + TrigramSimilarity("name", query)
+            )
+        )
+    return filter_ranked(queryset, recipe_index.get_scores(query), "rank")
@@ -1,3 +1,8 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
 from users.models import Follow, User
@@ -9,10 +14,19 @@ from recipes.models import (
     Shopping,
     Tag,
 )
-from api.fields import Base64ImageField
+from api.fields import (
+    Base64ImageField,
+    BulkPrimaryKeyRelatedField,
+    ImageVariantsField,
+    close_quietly,
+    get_objects,
+)
+from api.images import get_image_url
+from api.metrics import TimedSerializerMixin
+from api.utils import get_recipes_limit, limit_recipes_per_author
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для тегов."""
 
     class Meta:
@@ -20,7 +34,7 @@ class TagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для ингредиента."""
 
     class Meta:
@@ -28,7 +42,7 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для пользоателей."""
 
     is_subscribed = serializers.SerializerMethodField()
@@ -48,6 +62,8 @@ class UserSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         return Follow.objects.filter(user=user, author=obj.id).exists()
 
 
@@ -65,7 +81,7 @@ class ChangePasswordSerializer(serializers.ModelSerializer):
         )
 
 
-class FollowsSerializer(serializers.ModelSerializer):
+class FollowsSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Сериалайзер для подробного отображения автора с
     рецептами в подписке, на которых подписан
@@ -79,7 +95,7 @@ class FollowsSerializer(serializers.ModelSerializer):
     last_name = serializers.ReadOnlyField(source="author.last_name")
     is_subscribed = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.ReadOnlyField(source="author.recipes_count")
 
     class Meta:
         model = Follow
@@ -95,18 +111,16 @@ class FollowsSerializer(serializers.ModelSerializer):
         )
 
     def get_recipes(self, obj):
-        request = self.context.get("request")
-        recipes_limit = request.GET.get("recipes_limit")
-        queryset = Recipe.objects.filter(author=obj.author)
-        if recipes_limit:
-            queryset = queryset[: int(recipes_limit)]
-        return ShortRecipeSerializer(queryset, many=True).data
+        recipes = getattr(obj.author, "limited_recipes", None)
+        if recipes is None:
+            request = self.context.get("request")
+            recipes = limit_recipes_per_author(
+                obj.author.recipes.all(), get_recipes_limit(request)
+            )
+        return ShortRecipeSerializer(recipes, many=True).data
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(user=obj.user, author=obj.author).exists()
-
-    def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        return True
 
 
 class FollowAuthorSerializer(serializers.ModelSerializer):
@@ -130,23 +144,43 @@ class FollowAuthorSerializer(serializers.ModelSerializer):
         return serializer.data
 
 
+class IngredientRecipeListSerializer(serializers.ListSerializer):
+    """Находит все ингредиенты рецепта одним запросом."""
+
+    def to_internal_value(self, data):
+        ingredients = super().to_internal_value(data)
+        objects, missing = get_objects(
+            Ingredient.objects.all(),
+            [ingredient["ingredient"]["id"] for ingredient in ingredients],
+        )
+        if missing:
+            raise serializers.ValidationError(
+                "Не найдены ингредиенты с id: "
+                f"{', '.join(str(pk) for pk in missing)}."
+            )
+        for ingredient in ingredients:
+            ingredient["ingredient"]["id"] = objects[
+                ingredient["ingredient"]["id"]
+            ]
+        return ingredients
+
+
 class IngredientRecipeSerializer(serializers.ModelSerializer):
     """Сериалайзер для просмотра ингредиентов в рецепте."""
 
-    id = serializers.PrimaryKeyRelatedField(
-        source="ingredient.id", queryset=Ingredient.objects.all()
-    )
+    id = serializers.IntegerField(source="ingredient.id")
     name = serializers.CharField(read_only=True, source="ingredient.name")
     measurement_unit = serializers.CharField(
-        read_only=True, source="ingredients.measurement_unit"
+        read_only=True, source="ingredient.measurement_unit"
     )
 
     class Meta:
         model = IngredientRecipe
         fields = ("id", "name", "measurement_unit", "amount")
+        list_serializer_class = IngredientRecipeListSerializer
 
 
-class RecipeReadSerializer(serializers.ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериализатор для просмотра рецепта."""
 
     author = UserSerializer(read_only=True)
@@ -155,6 +189,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         source="ingredient_recipe", many=True, read_only=True
     )
     image = Base64ImageField()
+    images = ImageVariantsField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -168,6 +203,7 @@ class RecipeReadSerializer(serializers.ModelSerializer):
             "text",
             "cooking_time",
             "image",
+            "images",
             "tags",
             "is_favorited",
             "is_in_shopping_cart",
@@ -177,12 +213,16 @@ class RecipeReadSerializer(serializers.ModelSerializer):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         return Favorite.objects.filter(user=user, recipe=obj).exists()
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context.get("request").user
         if user.is_anonymous:
             return False
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         return Shopping.objects.filter(user=user, recipe=obj).exists()
 
 
@@ -194,9 +234,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         source="ingredient_recipe",
         many=True,
     )
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True, queryset=Tag.objects.all()
-    )
+    tags = BulkPrimaryKeyRelatedField(many=True, queryset=Tag.objects.all())
     image = Base64ImageField()
 
     class Meta:
@@ -213,21 +251,21 @@ class RecipeSerializer(serializers.ModelSerializer):
         )
 
     def validate(self, data):
-        ingredients = data["ingredient_recipe"]
-        tags = data["tags"]
-        if not tags:
+        if "tags" in data and not data["tags"]:
             raise serializers.ValidationError("Нужно выбрать тег!")
+        if "ingredient_recipe" not in data:
+            return data
+        ingredients = data["ingredient_recipe"]
         if not ingredients:
             raise serializers.ValidationError("Добавьте ингредиенты!")
-        ingredients_list = []
-        for ingredient in ingredients:
-            ingredient_id = ingredient["ingredient"]["id"]
-            if ingredient_id in ingredients_list:
-                raise serializers.ValidationError(
-                    "Добавлены повторные ингредиенты!"
-                )
-            ingredients_list.append(ingredient_id)
-
+        counts = Counter(
+            ingredient["ingredient"]["id"].id for ingredient in ingredients
+        )
+        repeated = [str(pk) for pk, count in counts.items() if count > 1]
+        if repeated:
+            raise serializers.ValidationError(
+                f"Добавлены повторные ингредиенты: {', '.join(repeated)}!"
+            )
         return data
 
     def create_ingredients(self, ingredients, recipe):
@@ -242,35 +280,93 @@ class RecipeSerializer(serializers.ModelSerializer):
             ]
         )
 
+    def update_ingredients(self, ingredients, recipe):
+        """
+        Меняет только отличающиеся строки: новые добавляет, у
+        оставшихся обновляет количество, лишние удаляет одним запросом.
+        """
+        amounts = {
+            ingredient["ingredient"]["id"].id: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        changed = []
+        removed = []
+        for row in IngredientRecipe.objects.filter(recipe=recipe):
+            amount = amounts.pop(row.ingredient_id, None)
+            if amount is None:
+                removed.append(row.id)
+            elif row.amount != amount:
+                row.amount = amount
+                changed.append(row)
+        if removed:
+            IngredientRecipe.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientRecipe.objects.bulk_update(changed, ["amount"])
+        if amounts:
+            IngredientRecipe.objects.bulk_create(
+                [
+                    IngredientRecipe(
+                        recipe=recipe, ingredient_id=ingredient, amount=amount
+                    )
+                    for ingredient, amount in amounts.items()
+                ]
+            )
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop("ingredient_recipe")
         tags = validated_data.pop("tags")
-        recipe = Recipe.objects.create(**validated_data)
+        try:
+            recipe = Recipe.objects.create(**validated_data)
+        finally:
+            close_quietly(validated_data["image"])
         recipe.tags.set(tags)
         self.create_ingredients(ingredients, recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        tags = validated_data.pop("tags")
-        ingredients = validated_data.pop("ingredient_recipe")
-        instance = super().update(instance, validated_data)
-        instance.tags.clear()
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.create_ingredients(recipe=instance, ingredients=ingredients)
+        tags = validated_data.pop("tags", None)
+        ingredients = validated_data.pop("ingredient_recipe", None)
+        if "image" in validated_data:
+            validated_data["image_processed"] = False
+        try:
+            instance = super().update(instance, validated_data)
+        finally:
+            close_quietly(validated_data.get("image"))
+        if tags is not None:
+            instance.tags.set(tags)
+        if ingredients is not None:
+            self.update_ingredients(ingredients, instance)
         return instance
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            "tags",
+            Prefetch(
+                "ingredient_recipe",
+                queryset=IngredientRecipe.objects.select_related("ingredient"),
+            ),
+        )
         serializer = RecipeReadSerializer(instance, context=self.context)
         return serializer.data
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+class ShortRecipeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """Сериалайзер для отображения сокращенного превью."""
 
+    image = serializers.SerializerMethodField()
+    images = ImageVariantsField()
+
     class Meta:
         model = Recipe
-        fields = ("id", "name", "image", "cooking_time")
+        fields = ("id", "name", "image", "images", "cooking_time")
+
+    def get_image(self, obj):
+        return get_image_url(
+            obj, settings.IMAGE_PREVIEW_SIZE, self.context.get("request")
+        )
 
 
 class FavoriteRecipeSerializer(serializers.ModelSerializer):
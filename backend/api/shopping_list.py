@@ -0,0 +1,102 @@
+import csv
+import io
+import os
+
+from django.conf import settings
+from django.db.models import Sum
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from recipes.models import IngredientRecipe
+from .cache import delete_cached, get_or_set_cached
+
+NAMESPACE = "shopping"
+CACHE_KEY = "list:{user_id}"
+PDF_FONT_NAME = "ShoppingListFont"
+CHUNK_SIZE = 8192
+
+
+def get_shopping_list(user):
+    """Возвращает суммированные ингредиенты из списка покупок."""
+    return get_or_set_cached(
+        NAMESPACE,
+        CACHE_KEY.format(user_id=user.id),
+        compute=lambda: list(
+            IngredientRecipe.objects.filter(recipe__shopping_cart__user=user)
+            .values_list("ingredient__name", "ingredient__measurement_unit")
+            .annotate(amount=Sum("amount"))
+            .order_by("ingredient__name")
+        ),
+        timeout=settings.SHOPPING_LIST_CACHE_TIMEOUT,
+    )
+
+
+def invalidate_shopping_list(*user_ids):
+    """Сбрасывает закешированные списки покупок пользователей."""
+    delete_cached(
+        NAMESPACE,
+        *(CACHE_KEY.format(user_id=user_id) for user_id in user_ids),
+    )
+
+
+def render_txt(ingredients):
+    for name, measurement_unit, amount in ingredients:
+        yield f"{name} - {amount} {measurement_unit}\n"
+
+
+class Echo:
+    """Псевдобуфер, который отдаёт записанную строку наружу."""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(("Ингредиент", "Количество", "Единица измерения"))
+    for name, measurement_unit, amount in ingredients:
+        yield writer.writerow((name, amount, measurement_unit))
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME in pdfmetrics.getRegisteredFontNames():
+        return PDF_FONT_NAME
+    font_path = settings.SHOPPING_LIST_PDF_FONT
+    if not os.path.exists(font_path):
+        return "Helvetica"
+    pdfmetrics.registerFont(TTFont(PDF_FONT_NAME, font_path))
+    return PDF_FONT_NAME
+
+
+def render_pdf(ingredients):
+    """
+    PDF собирается целиком в памяти: формат требует таблицу ссылок
+    в конце файла, поэтому наружу готовый документ отдаётся кусками.
+    """
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    _, height = A4
+    y = height - 50
+    pdf.setFont(font, 16)
+    pdf.drawString(50, y, "Список покупок")
+    pdf.setFont(font, 12)
+    for name, measurement_unit, amount in ingredients:
+        y -= 20
+        if y < 50:
+            pdf.showPage()
+            pdf.setFont(font, 12)
+            y = height - 50
+        pdf.drawString(50, y, f"{name} - {amount} {measurement_unit}")
+    pdf.save()
+    buffer.seek(0)
+    yield from iter(lambda: buffer.read(CHUNK_SIZE), b"")
+
+
+RENDERERS = {
+    "txt": ("text/plain; charset=utf-8", render_txt),
+    "csv": ("text/csv; charset=utf-8", render_csv),
+    "pdf": ("application/pdf", render_pdf),
+}
@@ -0,0 +1,218 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+)
+from django.dispatch import receiver
+
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    Shopping,
+    Tag,
+)
+from users.models import Follow, User
+
+from .cache import (
+    bump_generations,
+    get_namespace,
+    invalidates,
+    log_change,
+    watch,
+)
+from .feed import (
+    add_author_to_timeline,
+    fan_out_recipe,
+    remove_author_from_timeline,
+)
+from .images import schedule_image_processing
+from .recipe_ingredients_index import CHANGE_LOG_NAME
+from .shopping_list import invalidate_shopping_list
+
+watch(Recipe, Tag, Ingredient, Follow, Favorite, Shopping)
+
+RECIPES = get_namespace(Recipe)
+
+
+def get_recipe_scopes(author_ids, tag_slugs):
+    """Области кеша анонимных списков, которые затрагивает изменение."""
+    return [
+        "all",
+        *(f"author:{author_id}" for author_id in author_ids),
+        *(f"tag:{slug}" for slug in tag_slugs),
+    ]
+
+
+@invalidates(Shopping)
+def shopping_changed(instance):
+    invalidate_shopping_list(instance.user_id)
+
+
+@invalidates(Recipe)
+def recipe_changed(instance):
+    invalidate_shopping_list(
+        *Shopping.objects.filter(recipe_id=instance.pk).values_list(
+            "user_id", flat=True
+        )
+    )
+
+
+def get_ingredient_buyers(ingredient_id):
+    """Пользователи, у которых ингредиент есть в списке покупок."""
+    return list(
+        Shopping.objects.filter(recipe__ingredients=ingredient_id)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+
+@receiver(pre_delete, sender=Ingredient)
+def remember_ingredient_buyers(sender, instance, **kwargs):
+    # После удаления ингредиента его строк в рецептах уже нет.
+    instance.buyer_ids = get_ingredient_buyers(instance.pk)
+
+
+@invalidates(Ingredient)
+def ingredient_changed(instance):
+    # Название и единица измерения есть в списке покупок.
+    buyer_ids = getattr(instance, "buyer_ids", None)
+    if buyer_ids is None:
+        buyer_ids = get_ingredient_buyers(instance.pk)
+    invalidate_shopping_list(*buyer_ids)
+
+
+@invalidates(Recipe)
+def recipe_scopes_changed(instance):
+    tag_slugs = getattr(instance, "tag_slugs", None)
+    if tag_slugs is None:
+        tag_slugs = instance.tags.values_list("slug", flat=True)
+    bump_generations(
+        RECIPES, get_recipe_scopes([instance.author_id], tag_slugs)
+    )
+
+
+@invalidates(Recipe)
+def recipe_ingredients_changed(instance):
+    log_change(CHANGE_LOG_NAME, instance.pk)
+
+
+@receiver(post_save, sender=IngredientRecipe)
+@receiver(post_delete, sender=IngredientRecipe)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    # Строки меняются и без сохранения рецепта: в админке или при
+    # каскадном удалении ингредиента.
+    transaction.on_commit(
+        lambda: log_change(CHANGE_LOG_NAME, instance.recipe_id)
+    )
+
+
+@receiver(pre_delete, sender=Recipe)
+def remember_recipe_tags(sender, instance, **kwargs):
+    # После удаления связи с тегами уже не прочитать.
+    instance.tag_slugs = list(instance.tags.values_list("slug", flat=True))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    # Добавленные теги учитывает recipe_scopes_changed после сохранения
+    # рецепта, здесь остаются снятые теги и изменения со стороны тега.
+    if reverse and action in ("post_add", "post_remove", "pre_clear"):
+        recipes = (
+            instance.recipes.all()
+            if pk_set is None
+            else Recipe.objects.filter(pk__in=pk_set)
+        )
+        scopes = get_recipe_scopes(
+            set(recipes.values_list("author_id", flat=True)),
+            [instance.slug],
+        )
+    elif not reverse and action in ("post_remove", "pre_clear"):
+        tags = (
+            instance.tags.all()
+            if pk_set is None
+            else Tag.objects.filter(pk__in=pk_set)
+        )
+        scopes = get_recipe_scopes(
+            [instance.author_id], tags.values_list("slug", flat=True)
+        )
+    else:
+        return
+    transaction.on_commit(lambda: bump_generations(RECIPES, scopes))
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    # Имя автора есть в ответах о рецептах; вход в систему меняет
+    # только last_login.
+    if created or update_fields == frozenset(["last_login"]):
+        return
+    transaction.on_commit(
+        lambda: bump_generations(RECIPES, [f"author:{instance.pk}"])
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if instance.image and not instance.image_processed:
+        transaction.on_commit(
+            lambda: schedule_image_processing(instance.pk)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_published(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: fan_out_recipe(instance.pk, instance.author_id)
+        )
+
+
+@receiver(post_save, sender=Follow)
+def author_followed(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(
+            lambda: add_author_to_timeline(
+                instance.user_id, instance.author_id
+            )
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def author_unfollowed(sender, instance, **kwargs):
+    remove_author_from_timeline(instance.user_id, instance.author_id)
+
+
+COUNTERS = {
+    Favorite: (Recipe, "recipe_id", "favorites_count"),
+    Shopping: (Recipe, "recipe_id", "shopping_count"),
+    Recipe: (User, "author_id", "recipes_count"),
+    Follow: (User, "author_id", "followers_count"),
+}
+
+
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        model, field, counter = COUNTERS[sender]
+        model.objects.filter(pk=getattr(instance, field)).update(
+            **{counter: F(counter) + 1}
+        )
+
+
+def decrement_counter(sender, instance, **kwargs):
+    if getattr(instance, "parent_deleted", False):
+        return
+    model, field, counter = COUNTERS[sender]
+    model.objects.filter(pk=getattr(instance, field)).update(
+        **{counter: Greatest(F(counter) - 1, 0)}
+    )
+
+
+for sender in COUNTERS:
+    post_save.connect(increment_counter, sender=sender)
+    post_delete.connect(decrement_counter, sender=sender)
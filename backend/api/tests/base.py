@@ -0,0 +1,90 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Recipe, Shopping
+from recipes.seed import seed_dataset
+from users.models import User
+
+PASSWORD = "Budget-password-1"
+PAGE_SIZES = (1, 10)
+DUMMY_CACHE = {
+    "default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}
+}
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, CACHES=DUMMY_CACHE)
+class SeededAPITestCase(APITestCase):
+    """
+    Тесты на данных recipes.seed: пользователи, рецепты с 5–15
+    ингредиентами, подписки, избранное и покупки. Кеш отключён, поэтому
+    каждый запрос идёт в базу.
+    """
+
+    users = 20
+    recipes = 60
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(cls.users, cls.recipes)
+        cls.user = (
+            User.objects.filter(
+                follower__isnull=False,
+                shopping_cart__recipe__author__isnull=False,
+            )
+            .order_by("id")
+            .first()
+        )
+        # Свой рецепт в своей корзине: его изменение сбрасывает кеш
+        # списка покупок.
+        cls.own_recipe = Shopping.objects.filter(user=cls.user).values_list(
+            "recipe", flat=True
+        )[0]
+        Recipe.objects.filter(id=cls.own_recipe).update(author=cls.user)
+        # update() не меняет счётчики рецептов авторов.
+        call_command("reconcile_counters", stdout=StringIO())
+        cls.user.set_password(PASSWORD)
+        cls.user.save()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, path, data=None):
+        response = getattr(self.client, method.lower())(
+            path, data, format="json"
+        )
+        if response.streaming:
+            b"".join(response.streaming_content)
+        self.assertLess(
+            response.status_code,
+            400,
+            f"{method} {path}: {getattr(response, 'data', '')}",
+        )
+        return response
+
+    def assert_queries(self, count, method, path, data=None):
+        """Запрос к API делает ровно count запросов к базе."""
+        with self.assertNumQueries(count):
+            return self.request(method, path, data)
+
+    def assert_page_queries(self, count, path):
+        """
+        Число запросов страницы не зависит от её размера: path с {size}
+        запрашивается с каждым из PAGE_SIZES.
+        """
+        for size in PAGE_SIZES:
+            with self.subTest(size=size):
+                response = self.assert_queries(
+                    count, "GET", path.format(size=size)
+                )
+                self.assertTrue(response.data["results"])
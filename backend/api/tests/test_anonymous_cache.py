@@ -0,0 +1,61 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.images import process_recipe_image
+from recipes.models import Ingredient, Tag
+from recipes.seed import get_image
+
+from .base import SeededAPITestCase
+
+LOCMEM_CACHE = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "anonymous-cache-tests",
+    }
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class AnonymousCacheTests(SeededAPITestCase):
+    """Закешированные ответы анонимным пользователям не устаревают."""
+
+    users = 5
+    recipes = 10
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        response = self.request(
+            "POST",
+            "/api/recipes/",
+            {
+                "name": "Рецепт с картинкой",
+                "text": "Описание",
+                "cooking_time": 10,
+                "image": get_image(),
+                "tags": list(Tag.objects.values_list("id", flat=True)[:1]),
+                "ingredients": [
+                    {"id": pk, "amount": 10}
+                    for pk in Ingredient.objects.values_list(
+                        "id", flat=True
+                    )[:3]
+                ],
+            },
+        )
+        self.recipe = response.data["id"]
+        self.client.force_authenticate(None)
+
+    def test_processed_image_replaces_cached_url(self):
+        for path in ("/api/recipes/", f"/api/recipes/{self.recipe}/"):
+            with self.subTest(path=path):
+                before = self.request("GET", path).data
+                # Повторный запрос отдаётся из кеша.
+                with self.assertNumQueries(0):
+                    self.assertEqual(self.request("GET", path).data, before)
+        process_recipe_image(self.recipe)
+        response = self.request("GET", f"/api/recipes/{self.recipe}/")
+        self.assertNotEqual(response.data["image"], before["image"])
+        self.assertTrue(response.data["image"].endswith(".jpg"))
+        listed = self.request("GET", "/api/recipes/").data["results"][0]
+        self.assertEqual(listed["id"], self.recipe)
+        self.assertEqual(listed["image"], response.data["image"])
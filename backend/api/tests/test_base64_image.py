@@ -0,0 +1,48 @@
+import base64
+import os
+
+from django.test import SimpleTestCase, override_settings
+from rest_framework import serializers
+
+from api.fields import close_quietly, decode_base64_file
+
+PREFIX = "data:image/png;base64,"
+
+
+class DecodeBase64FileTests(SimpleTestCase):
+    """Картинки в base64 декодируются кусками."""
+
+    content = os.urandom(200 * 1024 + 1)
+
+    def decode(self, encoded):
+        return decode_base64_file(
+            PREFIX + encoded, len(PREFIX), "temp.png", "image/png"
+        )
+
+    def assert_decoded(self, encoded):
+        file = self.decode(encoded)
+        try:
+            self.assertEqual(file.size, len(self.content))
+            self.assertEqual(file.read(), self.content)
+        finally:
+            close_quietly(file)
+
+    def test_plain(self):
+        self.assert_decoded(base64.b64encode(self.content).decode())
+
+    def test_line_breaks(self):
+        # Строки по 76 символов, как у base64.encodebytes и MIME.
+        encoded = base64.encodebytes(self.content).decode()
+        self.assert_decoded(encoded)
+        self.assert_decoded(encoded.replace("\n", "\r\n") + " ")
+
+    @override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=1024)
+    def test_temporary_file(self):
+        self.assert_decoded(base64.encodebytes(self.content).decode())
+
+    def test_invalid(self):
+        encoded = base64.b64encode(self.content).decode()
+        for invalid in (encoded[:-1], encoded.replace("A", "*", 1)):
+            with self.subTest(invalid=invalid[:10]):
+                with self.assertRaises(serializers.ValidationError):
+                    self.decode(invalid)
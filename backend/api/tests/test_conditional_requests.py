@@ -0,0 +1,57 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from recipes.models import Ingredient, Tag
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ConditionalRequestTests(SeededAPITestCase):
+    """ETag и Last-Modified ответов о тегах и ингредиентах."""
+
+    users = 5
+    recipes = 10
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def assert_revalidated(self, path, change):
+        response = self.request("GET", path)
+        etag, modified = response["ETag"], response["Last-Modified"]
+        with self.assertNumQueries(0):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(path, HTTP_IF_MODIFIED_SINCE=modified)
+        self.assertEqual(response.status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        return response
+
+    def test_tag(self):
+        tag = Tag.objects.first()
+
+        def rename():
+            tag.name = "Новое название"
+            tag.save()
+
+        response = self.assert_revalidated(f"/api/tags/{tag.pk}/", rename)
+        self.assertEqual(response.data["name"], "Новое название")
+
+    def test_ingredients(self):
+        ingredient = Ingredient.objects.first()
+
+        def rename():
+            ingredient.measurement_unit = "щепотка"
+            ingredient.save()
+
+        response = self.assert_revalidated("/api/ingredients/", rename)
+        changed = next(
+            item for item in response.data if item["id"] == ingredient.pk
+        )
+        self.assertEqual(changed["measurement_unit"], "щепотка")
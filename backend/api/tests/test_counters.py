@@ -0,0 +1,142 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Count
+
+from recipes.models import Favorite, Recipe, Shopping
+from recipes.seed import get_image
+from users.models import Follow, User
+
+from .base import SeededAPITestCase
+
+
+class CountersTests(SeededAPITestCase):
+    """
+    Счётчики избранного, покупок, рецептов и подписчиков совпадают
+    с числом строк после изменений через API и каскадных удалений.
+    """
+
+    users = 10
+    recipes = 20
+
+    def assert_counters(self):
+        recipes = Recipe.objects.annotate(
+            favorites=Count("favorite", distinct=True),
+            carts=Count("shopping_cart", distinct=True),
+        )
+        for recipe in recipes:
+            with self.subTest(recipe=recipe.pk):
+                self.assertEqual(recipe.favorites_count, recipe.favorites)
+                self.assertEqual(recipe.shopping_count, recipe.carts)
+        users = User.objects.annotate(
+            recipes_total=Count("recipes", distinct=True),
+            followers=Count("following", distinct=True),
+        )
+        for user in users:
+            with self.subTest(user=user.pk):
+                self.assertEqual(user.recipes_count, user.recipes_total)
+                self.assertEqual(user.followers_count, user.followers)
+
+    def get_counter(self, model, pk, name):
+        return model.objects.values_list(name, flat=True).get(pk=pk)
+
+    def test_seed_is_consistent(self):
+        self.assert_counters()
+
+    def test_favorite_and_cart(self):
+        recipe = Recipe.objects.exclude(author=self.user).first().pk
+        for model, action, field in (
+            (Favorite, "favorite", "favorites_count"),
+            (Shopping, "shopping_cart", "shopping_count"),
+        ):
+            with self.subTest(action=action):
+                model.objects.filter(user=self.user, recipe=recipe).delete()
+                before = self.get_counter(Recipe, recipe, field)
+                path = f"/api/recipes/{recipe}/{action}/"
+                self.request("POST", path)
+                self.assertEqual(
+                    self.get_counter(Recipe, recipe, field), before + 1
+                )
+                self.request("DELETE", path)
+                self.assertEqual(
+                    self.get_counter(Recipe, recipe, field), before
+                )
+
+    def test_subscribe(self):
+        author = User.objects.exclude(pk=self.user.pk).first()
+        Follow.objects.filter(user=self.user, author=author).delete()
+        before = self.get_counter(User, author.pk, "followers_count")
+        path = f"/api/users/{author.pk}/subscribe/"
+        self.request("POST", path)
+        self.assertEqual(
+            self.get_counter(User, author.pk, "followers_count"), before + 1
+        )
+        self.request("DELETE", path)
+        self.assertEqual(
+            self.get_counter(User, author.pk, "followers_count"), before
+        )
+
+    def test_recipe_create_and_delete(self):
+        before = self.get_counter(User, self.user.pk, "recipes_count")
+        response = self.request(
+            "POST",
+            "/api/recipes/",
+            {
+                "name": "Рецепт для счётчиков",
+                "text": "Описание",
+                "cooking_time": 5,
+                "image": get_image(),
+                "tags": list(
+                    Recipe.tags.through.objects.values_list(
+                        "tag_id", flat=True
+                    )[:1]
+                ),
+                "ingredients": [
+                    {"id": pk, "amount": 1}
+                    for pk in Recipe.ingredients.through.objects.values_list(
+                        "ingredient_id", flat=True
+                    ).distinct()[:2]
+                ],
+            },
+        )
+        self.assertEqual(
+            self.get_counter(User, self.user.pk, "recipes_count"), before + 1
+        )
+        self.request("DELETE", f"/api/recipes/{response.data['id']}/")
+        self.assertEqual(
+            self.get_counter(User, self.user.pk, "recipes_count"), before
+        )
+
+    def test_cascade_delete(self):
+        # Рецепт в чужом избранном и корзинах, затем пользователь
+        # с подписками, избранным и покупками.
+        recipe = (
+            Recipe.objects.filter(favorite__isnull=False)
+            .filter(shopping_cart__isnull=False)
+            .first()
+        )
+        recipe.delete()
+        self.assert_counters()
+        user = (
+            User.objects.filter(follower__isnull=False)
+            .filter(favorite__isnull=False)
+            .filter(shopping_cart__isnull=False)
+            .exclude(pk=self.user.pk)
+            .first()
+        )
+        self.assertTrue(Follow.objects.filter(user=user).exists())
+        user.delete()
+        self.assert_counters()
+
+    def test_reconcile_counters(self):
+        Recipe.objects.update(favorites_count=99, shopping_count=0)
+        User.objects.filter(pk=self.user.pk).update(
+            recipes_count=99, followers_count=99
+        )
+        out = StringIO()
+        call_command("reconcile_counters", chunk_size=7, stdout=out)
+        self.assertIn(f"рецептов: {Recipe.objects.count()}", out.getvalue())
+        self.assert_counters()
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("рецептов: 0, пользователей: 0", out.getvalue())
@@ -0,0 +1,139 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from recipes.models import Recipe, TimelineEntry
+from users.models import User
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class FeedTests(SeededAPITestCase):
+    """
+    Лента подписок: рецепты обычных авторов раскладываются по лентам,
+    рецепты популярных добавляются при чтении.
+    """
+
+    users = 10
+    recipes = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.reader = User.objects.create_user(
+            username="reader", email="reader@example.com", password="x"
+        )
+        # Новый автор без подписчиков: его рецепты раскладываются.
+        cls.fanned = User.objects.create_user(
+            username="fanned", email="fanned@example.com", password="x"
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.fanned,
+                name=f"Рецепт автора {index}",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/feed.png",
+                image_processed=True,
+            )
+            for index in range(3)
+        )
+        # Самый популярный автор читается при запросе ленты.
+        cls.pulled = (
+            User.objects.filter(recipes__isnull=False)
+            .order_by("-followers_count", "id")
+            .first()
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(self.reader)
+
+    def get_recipes(self, author):
+        return list(
+            Recipe.objects.filter(author=author)
+            .order_by("-id")
+            .values_list("id", flat=True)
+        )
+
+    def subscribe(self, author, method="POST"):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.request(method, f"/api/users/{author.pk}/subscribe/")
+
+    def get_feed(self, query=""):
+        response = self.request("GET", f"/api/recipes/feed/?{query}")
+        return response.data
+
+    def get_feed_ids(self, limit=2):
+        ids = []
+        query = f"limit={limit}"
+        while True:
+            data = self.get_feed(query)
+            ids += [recipe["id"] for recipe in data["results"]]
+            if data["next"] is None:
+                return ids
+            query = data["next"].split("?", 1)[1]
+
+    def test_fanned_out_author(self):
+        self.subscribe(self.fanned)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(self.get_feed_ids(), self.get_recipes(self.fanned))
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.fanned,
+                name="Новый рецепт",
+                text="Описание",
+                cooking_time=10,
+                image="recipes/images/feed.png",
+                image_processed=True,
+            )
+        self.assertEqual(self.get_feed_ids()[0], recipe.pk)
+
+    def test_pulled_author(self):
+        with override_settings(
+            FEED_FANOUT_MAX_FOLLOWERS=self.pulled.followers_count
+        ):
+            self.subscribe(self.pulled)
+            self.assertFalse(
+                TimelineEntry.objects.filter(user=self.reader).exists()
+            )
+            self.assertEqual(
+                self.get_feed_ids(), self.get_recipes(self.pulled)
+            )
+
+    def test_merged_pages(self):
+        self.assertGreater(self.pulled.followers_count, 1)
+        with override_settings(
+            FEED_FANOUT_MAX_FOLLOWERS=self.pulled.followers_count
+        ):
+            self.subscribe(self.fanned)
+            self.subscribe(self.pulled)
+            expected = sorted(
+                self.get_recipes(self.fanned) + self.get_recipes(self.pulled),
+                reverse=True,
+            )
+            for limit in (1, 2, 100):
+                with self.subTest(limit=limit):
+                    self.assertEqual(self.get_feed_ids(limit), expected)
+            before = expected[1]
+            data = self.get_feed(f"limit=100&before={before}")
+            self.assertEqual(
+                [recipe["id"] for recipe in data["results"]], expected[2:]
+            )
+
+    def test_unsubscribe(self):
+        with override_settings(
+            FEED_FANOUT_MAX_FOLLOWERS=self.pulled.followers_count
+        ):
+            self.subscribe(self.fanned)
+            self.subscribe(self.pulled)
+            self.subscribe(self.fanned, "DELETE")
+            self.assertEqual(
+                self.get_feed_ids(), self.get_recipes(self.pulled)
+            )
+            self.subscribe(self.pulled, "DELETE")
+            self.assertEqual(self.get_feed_ids(), [])
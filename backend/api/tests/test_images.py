@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.test import override_settings
+
+from api.images import process_recipe_image
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.seed import get_image
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ImageProcessingTests(SeededAPITestCase):
+    """Сохранение устаревшего объекта не отменяет обработку картинки."""
+
+    users = 5
+    recipes = 10
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        response = self.request(
+            "POST",
+            "/api/recipes/",
+            {
+                "name": "Рецепт с картинкой",
+                "text": "Описание",
+                "cooking_time": 10,
+                "image": get_image(),
+                "tags": list(Tag.objects.values_list("id", flat=True)[:1]),
+                "ingredients": [
+                    {"id": pk, "amount": 10}
+                    for pk in Ingredient.objects.values_list(
+                        "id", flat=True
+                    )[:3]
+                ],
+            },
+        )
+        self.recipe = response.data["id"]
+
+    def test_stale_save_keeps_processed_image(self):
+        stale = Recipe.objects.get(pk=self.recipe)
+        original = stale.image.name
+        process_recipe_image(self.recipe)
+        self.assertFalse(default_storage.exists(original))
+        stale.name = "Новое название"
+        stale.save()
+        recipe = Recipe.objects.get(pk=self.recipe)
+        self.assertEqual(recipe.name, "Новое название")
+        self.assertTrue(recipe.image_processed)
+        self.assertNotEqual(recipe.image.name, original)
+        self.assertTrue(default_storage.exists(recipe.image.name))
+
+    def test_new_image_is_saved(self):
+        process_recipe_image(self.recipe)
+        processed = Recipe.objects.get(pk=self.recipe).image.name
+        self.request(
+            "PATCH", f"/api/recipes/{self.recipe}/", {"image": get_image()}
+        )
+        recipe = Recipe.objects.get(pk=self.recipe)
+        self.assertFalse(recipe.image_processed)
+        self.assertNotEqual(recipe.image.name, processed)
+        self.assertTrue(default_storage.exists(recipe.image.name))
@@ -0,0 +1,44 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from api.recipe_ingredients_index import recipe_ingredients_index
+from recipes.models import Ingredient, IngredientRecipe
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ImportCsvTests(SeededAPITestCase):
+    """Загрузка ингредиентов с --truncate сбрасывает кеш один раз."""
+
+    users = 5
+    recipes = 10
+
+    def test_truncate(self):
+        cache.clear()
+        ingredient = IngredientRecipe.objects.values_list(
+            "ingredient_id", flat=True
+        )[0]
+        self.assertTrue(recipe_ingredients_index.search([ingredient]))
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".csv", encoding="utf-8", delete=False
+        ) as file:
+            file.write("соль,г\nсахар,г\n")
+        self.addCleanup(os.remove, file.name)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            call_command(
+                "import_csv", path=file.name, truncate=True, stdout=StringIO()
+            )
+        self.assertEqual(len(callbacks), 2)
+        self.assertFalse(IngredientRecipe.objects.exists())
+        self.assertEqual(recipe_ingredients_index.search([ingredient]), [])
+        self.assertEqual(
+            sorted(Ingredient.objects.values_list("name", flat=True)),
+            ["сахар", "соль"],
+        )
@@ -0,0 +1,46 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from api.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class IngredientIndexTests(SeededAPITestCase):
+    """Поиск ингредиентов по индексу в памяти и его перестройка."""
+
+    users = 5
+    recipes = 10
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def get_names(self, name):
+        response = self.request("GET", f"/api/ingredients/?name={name}")
+        return [ingredient["name"] for ingredient in response.data]
+
+    def test_prefix_before_substring(self):
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name="мука пшеничная", measurement_unit="г"),
+                Ingredient(name="рисовая мука", measurement_unit="г"),
+            ]
+        )
+        names = self.get_names("мука")
+        self.assertLess(
+            names.index("мука пшеничная"), names.index("рисовая мука")
+        )
+
+    def test_rebuild_after_change(self):
+        ingredient = Ingredient.objects.first()
+        self.assertEqual(
+            len(ingredient_index.all()), Ingredient.objects.count()
+        )
+        ingredient.name = "новое название"
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient.save()
+        self.assertEqual(self.get_names("новое")[0], "новое название")
@@ -0,0 +1,258 @@
+from api.urls import router
+from recipes.models import Ingredient, IngredientRecipe, Recipe, Tag
+from recipes.seed import get_image
+from users.models import Follow, User
+
+from .base import PASSWORD, SeededAPITestCase
+
+# Сценарии djoser для подтверждения почты, сброса пароля и удаления
+# пользователя: письма, одноразовые токены и каскадное удаление.
+EXEMPT = {
+    ("DELETE", "me"),
+    ("POST", "activation"),
+    ("POST", "resend_activation"),
+    ("POST", "reset_password"),
+    ("POST", "reset_password_confirm"),
+    ("POST", "reset_username"),
+    ("POST", "reset_username_confirm"),
+    ("POST", "set_username"),
+    ("PUT", "update"),
+    ("PATCH", "partial_update"),
+    ("DELETE", "destroy"),
+}
+EXEMPT_VIEWSETS = {"users"}
+
+
+class QueryBudgetTests(SeededAPITestCase):
+    """
+    Число SQL-запросов каждого маршрута api.urls. Тест называется
+    test_<метод>_<префикс роутера>_<action>; для списков число запросов
+    не должно зависеть от размера страницы.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.author = Follow.objects.filter(user=cls.user).values_list(
+            "author", flat=True
+        )[0]
+        cls.stranger = (
+            User.objects.exclude(id=cls.user.id)
+            .exclude(following__user=cls.user)
+            .values_list("id", flat=True)
+        )[0]
+        cls.other = (
+            Recipe.objects.exclude(author=cls.user)
+            .exclude(shopping_cart__user=cls.user)
+            .exclude(favorite__user=cls.user)
+            .values_list("id", flat=True)
+        )[0]
+        tags = list(Tag.objects.order_by("id").values_list("id", flat=True))
+        cls.tags = tags[:2]
+        cls.ingredients = list(
+            Ingredient.objects.order_by("id").values_list("id", flat=True)
+        )
+        # Состав своего рецепта задан явно: изменение снимает тег,
+        # меняет, удаляет и добавляет ингредиенты.
+        recipe = Recipe.objects.get(pk=cls.own_recipe)
+        recipe.tags.set(tags[1:3])
+        IngredientRecipe.objects.filter(recipe=recipe).delete()
+        IngredientRecipe.objects.bulk_create(
+            IngredientRecipe(recipe=recipe, ingredient_id=pk, amount=10)
+            for pk in cls.ingredients[:10]
+        )
+
+    def get_recipe(self, ingredients=slice(0, 10), amount=10):
+        return {
+            "name": "Рецепт для проверки",
+            "text": "Описание",
+            "cooking_time": 10,
+            "image": get_image(),
+            "tags": self.tags,
+            "ingredients": [
+                {"id": ingredient, "amount": amount}
+                for ingredient in self.ingredients[ingredients]
+            ],
+        }
+
+    def test_every_route_has_budget(self):
+        for prefix, viewset, _ in router.registry:
+            for route in router.get_routes(viewset):
+                mapping = router.get_method_map(viewset, route.mapping)
+                for method, action in mapping.items():
+                    method = method.upper()
+                    if prefix in EXEMPT_VIEWSETS and (method, action) in (
+                        EXEMPT
+                    ):
+                        continue
+                    name = f"test_{method.lower()}_{prefix}_{action}"
+                    with self.subTest(route=f"{method} {prefix}.{action}"):
+                        self.assertTrue(hasattr(self, name), name)
+
+    def test_get_users_list(self):
+        self.assert_page_queries(2, "/api/users/?limit={size}")
+
+    def test_post_users_create(self):
+        self.client.force_authenticate(None)
+        self.assert_queries(
+            5,
+            "POST",
+            "/api/users/",
+            {
+                "email": "budget@example.com",
+                "username": "budget",
+                "first_name": "Budget",
+                "last_name": "Budget",
+                "password": PASSWORD,
+            },
+        )
+
+    def test_get_users_me(self):
+        self.assert_queries(0, "GET", "/api/users/me/")
+
+    def test_put_users_me(self):
+        self.assert_queries(
+            2,
+            "PUT",
+            "/api/users/me/",
+            {
+                "email": self.user.email,
+                "username": self.user.username,
+                "first_name": "Бюджет",
+                "last_name": "Бюджет",
+            },
+        )
+
+    def test_patch_users_me(self):
+        self.assert_queries(
+            1, "PATCH", "/api/users/me/", {"last_name": "Бюджет"}
+        )
+
+    def test_get_users_retrieve(self):
+        self.assert_queries(1, "GET", f"/api/users/{self.author}/")
+
+    def test_post_users_set_password(self):
+        self.assert_queries(
+            1,
+            "POST",
+            "/api/users/set_password/",
+            {"new_password": PASSWORD, "current_password": PASSWORD},
+        )
+
+    def test_get_users_subscriptions(self):
+        self.assert_page_queries(
+            3, "/api/users/subscriptions/?limit={size}&recipes_limit=3"
+        )
+
+    def test_post_users_subscribe(self):
+        self.assert_queries(
+            7, "POST", f"/api/users/{self.stranger}/subscribe/"
+        )
+
+    def test_delete_users_subscribe(self):
+        path = f"/api/users/{self.stranger}/subscribe/"
+        self.request("POST", path)
+        # Отписка убирает рецепты автора из ленты.
+        self.assert_queries(5, "DELETE", path)
+
+    def test_get_recipes_list(self):
+        for path in (
+            "/api/recipes/?limit={size}",
+            "/api/recipes/?limit={size}&is_favorited=1",
+            "/api/recipes/?limit={size}&is_in_shopping_cart=1",
+        ):
+            with self.subTest(path=path):
+                self.assert_page_queries(5, path)
+        # Плюс проверка, что автор существует.
+        self.assert_page_queries(
+            6, f"/api/recipes/?limit={{size}}&author={self.author}"
+        )
+
+    def test_get_recipes_feed(self):
+        # Лента и рецепты популярных авторов, затем сами рецепты.
+        self.assert_page_queries(6, "/api/recipes/feed/?limit={size}")
+
+    def test_post_recipes_create(self):
+        # Ингредиенты и теги рецепта проверяются одним запросом, поэтому
+        # число запросов не зависит от их числа.
+        for ingredients in (slice(0, 3), slice(0, 10), slice(5, 25)):
+            with self.subTest(ingredients=ingredients):
+                self.assert_queries(
+                    15, "POST", "/api/recipes/", self.get_recipe(ingredients)
+                )
+
+    def test_get_recipes_retrieve(self):
+        self.assert_queries(4, "GET", f"/api/recipes/{self.other}/")
+
+    def test_get_recipes_similar(self):
+        # Соседи считаются заранее и читаются вместе с рецептами.
+        self.assert_queries(1, "GET", f"/api/recipes/{self.other}/similar/")
+
+    def test_put_recipes_update(self):
+        # Снятые теги читаются для сброса кеша анонимных списков по этим
+        # тегам, изменение рецепта из корзины сбрасывает кеш списка
+        # покупок у всех, кто его добавил. Удалённые ингредиенты рецепта
+        # читаются перед удалением для журнала изменений.
+        self.assert_queries(
+            21,
+            "PUT",
+            f"/api/recipes/{self.own_recipe}/",
+            self.get_recipe(slice(5, 25), amount=20),
+        )
+
+    def test_patch_recipes_partial_update(self):
+        self.assert_queries(
+            17,
+            "PATCH",
+            f"/api/recipes/{self.own_recipe}/",
+            self.get_recipe(),
+        )
+
+    def test_delete_recipes_destroy(self):
+        # Удаление рецепта чистит ленты, оценки популярности и похожие
+        # рецепты; его ингредиенты читаются для журнала изменений.
+        self.assert_queries(
+            17, "DELETE", f"/api/recipes/{self.own_recipe}/"
+        )
+
+    def test_post_recipes_favorite(self):
+        self.assert_queries(
+            6, "POST", f"/api/recipes/{self.other}/favorite/"
+        )
+
+    def test_delete_recipes_favorite(self):
+        path = f"/api/recipes/{self.other}/favorite/"
+        self.request("POST", path)
+        self.assert_queries(4, "DELETE", path)
+
+    def test_post_recipes_shopping_cart(self):
+        self.assert_queries(
+            6, "POST", f"/api/recipes/{self.other}/shopping_cart/"
+        )
+
+    def test_delete_recipes_shopping_cart(self):
+        path = f"/api/recipes/{self.other}/shopping_cart/"
+        self.request("POST", path)
+        self.assert_queries(4, "DELETE", path)
+
+    def test_get_recipes_download_shopping_cart(self):
+        self.assert_queries(1, "GET", "/api/recipes/download_shopping_cart/")
+
+    def test_get_ingredients_list(self):
+        name = Ingredient.objects.values_list("name", flat=True)[0][:2]
+        path = f"/api/ingredients/?name={name}"
+        # Поиск по префиксу идёт по индексу в памяти процесса, который
+        # строит первый запрос.
+        self.request("GET", path)
+        self.assertTrue(self.assert_queries(0, "GET", path).data)
+
+    def test_get_ingredients_retrieve(self):
+        self.assert_queries(
+            1, "GET", f"/api/ingredients/{self.ingredients[0]}/"
+        )
+
+    def test_get_tags_list(self):
+        self.assert_queries(1, "GET", "/api/tags/")
+
+    def test_get_tags_retrieve(self):
+        self.assert_queries(1, "GET", f"/api/tags/{self.tags[0]}/")
@@ -0,0 +1,68 @@
+import re
+from itertools import combinations
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.filters import RecipeFilter
+from recipes.models import Favorite, Recipe, Tag
+from recipes.seed import seed_dataset
+
+SEQ_SCAN = re.compile(r"Seq Scan on (\w+)")
+CHECKED_TABLES = {
+    "recipes_recipe",
+    "recipes_recipe_tags",
+    "recipes_favorite",
+    "recipes_shopping",
+    "recipes_ingredientrecipe",
+    "users_follow",
+}
+
+
+# SQLite показывает упорядоченный обход по rowid как обычный SCAN,
+# поэтому планы проверяются только на PostgreSQL.
+@skipUnless(connection.vendor == "postgresql", "Нужен PostgreSQL.")
+class QueryPlanTests(TestCase):
+    """
+    Фильтры RecipeFilter в любых сочетаниях не приводят к полному
+    сканированию таблиц рецептов, избранного, покупок и подписок.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_dataset(users=200, recipes=5000)
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+        favorite = Favorite.objects.select_related("recipe", "user").first()
+        cls.user = favorite.user
+        cls.params = {
+            "author": str(favorite.recipe.author_id),
+            "tags": Tag.objects.filter(recipes__isnull=False).first().slug,
+            "is_favorited": "1",
+            "is_in_shopping_cart": "1",
+        }
+
+    def get_plan(self, params):
+        request = Request(APIRequestFactory().get("/api/recipes/", params))
+        request.user = self.user
+        queryset = RecipeFilter(
+            request.query_params,
+            queryset=Recipe.objects.all(),
+            request=request,
+        ).qs
+        return queryset[:6].explain()
+
+    def test_filters_use_indexes(self):
+        for size in range(len(self.params) + 1):
+            for names in combinations(self.params, size):
+                with self.subTest(filters=", ".join(names) or "нет"):
+                    plan = self.get_plan(
+                        {name: self.params[name] for name in names}
+                    )
+                    self.assertFalse(
+                        CHECKED_TABLES.intersection(SEQ_SCAN.findall(plan)),
+                        plan,
+                    )
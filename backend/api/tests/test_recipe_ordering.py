@@ -0,0 +1,122 @@
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import override_settings
+
+from api.cache import bump_version
+from api.recipe_index import VERSION_NAME
+from api.recipe_ingredients_index import recipe_ingredients_index
+from recipes.models import Ingredient, Recipe
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecipeOrderingTests(SeededAPITestCase):
+    """
+    ordering из запроса сортирует первым, релевантность фильтров
+    ingredients и search — вторым ключом, затем новые первыми.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.ingredients = list(
+            Ingredient.objects.annotate(recipes_count=Count("recipes"))
+            .order_by("-recipes_count", "id")
+            .values_list("id", flat=True)[:3]
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        # Рецепты seed созданы через bulk_create без сигналов, поэтому
+        # версию рецептов меняем, как после загрузки данных.
+        bump_version(VERSION_NAME)
+
+    def get_ids(self, query):
+        response = self.request("GET", f"/api/recipes/?limit=100&{query}")
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def get_ingredients_query(self):
+        return "ingredients_match=any&" + "&".join(
+            f"ingredients={pk}" for pk in self.ingredients
+        )
+
+    def test_ingredients_rank(self):
+        ranked = recipe_ingredients_index.search(
+            self.ingredients, match_all=False
+        )
+        self.assertGreater(len(ranked), 1)
+        response = self.request(
+            "GET", f"/api/recipes/?limit=100&{self.get_ingredients_query()}"
+        )
+        self.assertNotIn("ingredients_limit", response.data)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]], ranked
+        )
+
+    @override_settings(RECIPES_INGREDIENTS_LIMIT=2)
+    def test_ingredients_limit(self):
+        ranked = recipe_ingredients_index.search(
+            self.ingredients, match_all=False
+        )
+        response = self.request(
+            "GET", f"/api/recipes/?limit=100&{self.get_ingredients_query()}"
+        )
+        self.assertEqual(response.data["ingredients_limit"], 2)
+        self.assertEqual(
+            [recipe["id"] for recipe in response.data["results"]], ranked[:2]
+        )
+
+    def test_ordering_before_ingredients_rank(self):
+        ranked = recipe_ingredients_index.search(
+            self.ingredients, match_all=False
+        )
+        cooking_time = dict(
+            Recipe.objects.values_list("id", "cooking_time")
+        )
+        expected = sorted(
+            ranked, key=lambda pk: (cooking_time[pk], ranked.index(pk))
+        )
+        self.assertEqual(
+            self.get_ids(
+                f"{self.get_ingredients_query()}&ordering=cooking_time"
+            ),
+            expected,
+        )
+
+    def test_ordering_before_search_rank(self):
+        ids = self.get_ids("search=рецепт&ordering=cooking_time")
+        times = list(
+            Recipe.objects.filter(id__in=ids).values_list(
+                "id", "cooking_time"
+            )
+        )
+        times = dict(times)
+        self.assertGreater(len(ids), 1)
+        self.assertEqual(
+            [times[pk] for pk in ids], sorted(times[pk] for pk in ids)
+        )
+
+    def test_cursor_rejects_other_ordering(self):
+        ids = self.get_ids("cursor=")
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        for query in (
+            "ordering=cooking_time",
+            "search=рецепт",
+            self.get_ingredients_query(),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f"/api/recipes/?cursor=&{query}")
+                self.assertEqual(response.status_code, 400)
+                self.assertIn("cursor", response.data)
+
+    def test_search_sees_saved_recipe(self):
+        recipe = Recipe.objects.get(pk=self.own_recipe)
+        self.assertEqual(self.get_ids("search=шакшука"), [])
+        recipe.name = "Шакшука"
+        recipe.image_processed = True
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.get_ids("search=шакшука"), [recipe.pk])
@@ -0,0 +1,92 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, RecipeScore, Shopping
+from users.models import User
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class RecipeScoresTests(SeededAPITestCase):
+    """
+    update_recipe_scores и ordering=popular/trending: вес событий
+    убывает вдвое за RECIPE_POPULAR_HALF_LIFE (7 дней) и
+    RECIPE_TRENDING_HALF_LIFE (1 день).
+    """
+
+    users = 5
+    recipes = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Favorite.objects.all().delete()
+        Shopping.objects.all().delete()
+        RecipeScore.objects.all().delete()
+        cls.readers = list(User.objects.order_by("id"))
+        cls.old, cls.fresh, cls.bought = Recipe.objects.order_by("id")[:3]
+        now = timezone.now()
+        # Популярность: 3 * 2^(-10/7) ≈ 1.11, 2^(-1/168) ≈ 1.00,
+        # 2 * 2^(-3/7) ≈ 1.49. За день: 0.003, 0.97 и 0.25.
+        for reader in cls.readers[:3]:
+            cls.add(Favorite, reader, cls.old, now - timedelta(days=10))
+        cls.add(Favorite, cls.readers[0], cls.fresh, now - timedelta(hours=1))
+        cls.add(Shopping, cls.readers[0], cls.bought, now - timedelta(days=3))
+
+    @classmethod
+    def add(cls, model, user, recipe, created_at):
+        return model.objects.create(
+            user=user, recipe=recipe, created_at=created_at
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+    def update_scores(self):
+        out = StringIO()
+        call_command("update_recipe_scores", stdout=out)
+        return out.getvalue()
+
+    def get_ids(self, ordering):
+        response = self.request(
+            "GET", f"/api/recipes/?ordering={ordering}&limit=3"
+        )
+        return [recipe["id"] for recipe in response.data["results"]]
+
+    def test_decayed_order(self):
+        self.assertIn("Пересчитано рецептов: 3", self.update_scores())
+        old, fresh, bought = self.old.pk, self.fresh.pk, self.bought.pk
+        self.assertEqual(self.get_ids("popular"), [bought, old, fresh])
+        self.assertEqual(self.get_ids("trending"), [fresh, bought, old])
+
+    def test_only_changed_recipes(self):
+        self.update_scores()
+        self.assertIn("Пересчитано рецептов: 0", self.update_scores())
+        computed = dict(
+            RecipeScore.objects.values_list("recipe_id", "computed_at")
+        )
+        # Новое событие поднимает рецепт, удалённое — убирает оценку.
+        self.add(Shopping, self.readers[1], self.old, timezone.now())
+        Shopping.objects.filter(recipe=self.bought).delete()
+        self.assertIn("Пересчитано рецептов: 2", self.update_scores())
+        self.assertEqual(
+            RecipeScore.objects.get(recipe=self.fresh).computed_at,
+            computed[self.fresh.pk],
+        )
+        self.assertFalse(
+            RecipeScore.objects.filter(recipe=self.bought).exists()
+        )
+        self.assertEqual(
+            self.get_ids("popular")[:2], [self.old.pk, self.fresh.pk]
+        )
+        self.assertEqual(
+            self.get_ids("trending")[:2], [self.old.pk, self.fresh.pk]
+        )
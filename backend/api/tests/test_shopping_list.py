@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import override_settings
+
+from recipes.models import Ingredient
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class ShoppingListCacheTests(SeededAPITestCase):
+    """Закешированный список покупок не устаревает."""
+
+    users = 5
+    recipes = 10
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.ingredient = Ingredient.objects.filter(
+            recipes__shopping_cart__user=self.user
+        ).first()
+
+    def download(self):
+        response = self.client.get("/api/recipes/download_shopping_cart/")
+        return b"".join(response.streaming_content).decode()
+
+    def test_ingredient_change_resets_list(self):
+        self.assertIn(f"{self.ingredient.name} - ", self.download())
+        self.ingredient.name = "Переименованный ингредиент"
+        self.ingredient.measurement_unit = "щепотка"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.save()
+        self.assertIn("Переименованный ингредиент", self.download())
+        self.assertIn("щепотка", self.download())
+
+    def test_ingredient_delete_resets_list(self):
+        line = f"{self.ingredient.name} - "
+        self.assertIn(line, self.download())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ingredient.delete()
+        self.assertNotIn(line, self.download())
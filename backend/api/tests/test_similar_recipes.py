@@ -0,0 +1,41 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import override_settings
+
+from recipes.models import Recipe, SimilarRecipe
+
+from .base import SeededAPITestCase
+from .test_anonymous_cache import LOCMEM_CACHE
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class SimilarRecipesTests(SeededAPITestCase):
+    """Похожие рецепты в небольшом каталоге и их свежесть."""
+
+    users = 5
+    recipes = 10
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        call_command("update_similar_recipes", stdout=StringIO())
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client.force_authenticate(None)
+
+    def test_small_catalog_has_neighbours(self):
+        for pk in Recipe.objects.values_list("id", flat=True):
+            with self.subTest(recipe=pk):
+                self.assertTrue(
+                    self.request("GET", f"/api/recipes/{pk}/similar/").data
+                )
+
+    def test_similar_is_not_cached(self):
+        path = f"/api/recipes/{self.own_recipe}/similar/"
+        self.assertTrue(self.request("GET", path).data)
+        SimilarRecipe.objects.filter(recipe_id=self.own_recipe).delete()
+        self.assertEqual(self.request("GET", path).data, [])
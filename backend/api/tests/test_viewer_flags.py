@@ -0,0 +1,75 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from recipes.models import Favorite, Shopping
+from users.models import Follow
+
+from .base import PAGE_SIZES, SeededAPITestCase
+
+
+class ViewerFlagsTests(SeededAPITestCase):
+    """
+    Признаки is_favorited, is_in_shopping_cart и is_subscribed считаются
+    в том же запросе, что и страница, а не отдельным запросом на каждый
+    рецепт или автора.
+    """
+
+    def get_pages(self, path):
+        """Ответы и число запросов для каждого из PAGE_SIZES."""
+        pages = []
+        for size in PAGE_SIZES:
+            with CaptureQueriesContext(connection) as context:
+                response = self.request("GET", path.format(size=size))
+            pages.append((response.data["results"], len(context)))
+        # На большой странице действительно больше одного объекта.
+        self.assertEqual(len(pages[0][0]), 1)
+        self.assertGreater(len(pages[-1][0]), 1)
+        return pages
+
+    def assert_same_queries(self, pages):
+        counts = [count for _, count in pages]
+        self.assertEqual(len(set(counts)), 1, dict(zip(PAGE_SIZES, counts)))
+
+    def test_recipes_list(self):
+        favorites = set(
+            Favorite.objects.filter(user=self.user).values_list(
+                "recipe", flat=True
+            )
+        )
+        cart = set(
+            Shopping.objects.filter(user=self.user).values_list(
+                "recipe", flat=True
+            )
+        )
+        following = set(
+            Follow.objects.filter(user=self.user).values_list(
+                "author", flat=True
+            )
+        )
+        pages = self.get_pages("/api/recipes/?limit={size}")
+        self.assert_same_queries(pages)
+        for recipe in pages[-1][0]:
+            self.assertEqual(recipe["is_favorited"], recipe["id"] in favorites)
+            self.assertEqual(
+                recipe["is_in_shopping_cart"], recipe["id"] in cart
+            )
+            self.assertEqual(
+                recipe["author"]["is_subscribed"],
+                recipe["author"]["id"] in following,
+            )
+
+    def test_favorited_recipes_list(self):
+        pages = self.get_pages("/api/recipes/?limit={size}&is_favorited=1")
+        self.assert_same_queries(pages)
+        self.assertTrue(
+            all(recipe["is_favorited"] for recipe in pages[-1][0])
+        )
+
+    def test_subscriptions(self):
+        pages = self.get_pages(
+            "/api/users/subscriptions/?limit={size}&recipes_limit=3"
+        )
+        self.assert_same_queries(pages)
+        for author in pages[-1][0]:
+            self.assertTrue(author["is_subscribed"])
+            self.assertLessEqual(len(author["recipes"]), 3)
@@ -1,15 +1,25 @@
+from collections import defaultdict
+
+from django.db.models import (
+    Case,
+    Exists,
+    FloatField,
+    OuterRef,
+    Subquery,
+    Value,
+    When,
+)
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from recipes.models import Recipe
+from recipes.models import Favorite, Recipe, Shopping
+from users.models import Follow
 
 
-def post_method(request, pk, get_serializer):
-    user = request.user
-    recipe = get_object_or_404(Recipe, pk=pk)
+def post_method(request, recipe, get_serializer):
     serializer = get_serializer(
-        data={"user": user.id, "recipe": recipe.id},
+        data={"user": request.user.id, "recipe": recipe.id},
         context={"request": request},
     )
     serializer.is_valid(raise_exception=True)
@@ -17,11 +27,78 @@ def post_method(request, pk, get_serializer):
     return Response(serializer.data, status=status.HTTP_201_CREATED)
 
 
-def delete_method(request, pk, get_model):
-    obj = get_object_or_404(
-        get_model,
-        recipe=get_object_or_404(Recipe, pk=pk),
-        user=request.user,
-    )
+def delete_method(request, recipe, get_model):
+    obj = get_object_or_404(get_model, recipe=recipe, user=request.user)
     obj.delete()
     return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+def annotate_is_subscribed(queryset, user):
+    """Добавляет к пользователям признак подписки на них текущего юзера."""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        is_subscribed=Exists(
+            Follow.objects.filter(user=user, author=OuterRef("pk"))
+        )
+    )
+
+
+def annotate_recipe_flags(queryset, user):
+    """Добавляет к рецептам признаки избранного и списка покупок."""
+    if user.is_anonymous:
+        return queryset
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favorite.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+        is_in_shopping_cart=Exists(
+            Shopping.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+    )
+
+
+def get_recipes_limit(request):
+    """Возвращает значение recipes_limit из запроса или None."""
+    recipes_limit = request.query_params.get("recipes_limit", "")
+    if recipes_limit.isdigit():
+        return int(recipes_limit)
+    return None
+
+
+def limit_recipes_per_author(queryset, recipes_limit):
+    """Оставляет не больше recipes_limit последних рецептов автора."""
+    queryset = queryset.order_by("-id")
+    if recipes_limit is None:
+        return queryset
+    return queryset.filter(
+        pk__in=Subquery(
+            Recipe.objects.filter(author=OuterRef("author"))
+            .order_by("-id")
+            .values("pk")[:recipes_limit]
+        )
+    )
+
+
+def filter_ranked(queryset, ranks, name):
+    """
+    Оставляет объекты с pk из ranks ({pk: ранг}) и добавляет ранг
+    аннотацией name. Объекты с одинаковым рангом попадают в одну ветку
+    CASE. Порядок задаёт RecipeFilter.filter_queryset.
+    """
+    if not ranks:
+        return queryset.none()
+    tiers = defaultdict(list)
+    for pk, rank in ranks.items():
+        tiers[rank].append(pk)
+    return queryset.filter(pk__in=list(ranks)).annotate(
+        **{
+            name: Case(
+                *(
+                    When(pk__in=pks, then=Value(rank))
+                    for rank, pks in tiers.items()
+                ),
+                output_field=FloatField(),
+            )
+        }
+    )
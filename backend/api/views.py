@@ -1,17 +1,25 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import mimetypes
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from .feed import get_feed_ids
 from .filters import IngredientSearchFilter, RecipeFilter
+from .images import render_variant
+from .ingredient_index import ingredient_index
+from .metrics import registry
+from .mixins import AnonymousCacheMixin, VersionedCacheMixin
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
-from .pagination import LimitPageNumberPagination
+from .pagination import FeedPagination, OptionalCursorPagination
+from .shopping_list import RENDERERS, get_shopping_list
 from .serializers import (
     FollowAuthorSerializer,
     FavoriteRecipeSerializer,
@@ -19,16 +27,25 @@ from .serializers import (
     IngredientSerializer,
     RecipeSerializer,
     ShopingRecipeSerializer,
+    ShortRecipeSerializer,
     TagSerializer,
     UserSerializer,
 )
-from .utils import delete_method, post_method
+from .utils import (
+    annotate_is_subscribed,
+    annotate_recipe_flags,
+    delete_method,
+    get_recipes_limit,
+    limit_recipes_per_author,
+    post_method,
+)
 from recipes.models import (
     Favorite,
     Ingredient,
     IngredientRecipe,
     Recipe,
     Shopping,
+    SimilarRecipe,
     Tag,
 )
 from users.models import Follow, User
@@ -40,9 +57,14 @@ class UserViewSet(UserViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     search_fields = ("username", "email")
-    pagination_class = PageNumberPagination
+    pagination_class = OptionalCursorPagination
     permission_classes = (AllowAny,)
 
+    def get_queryset(self):
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
     @action(
         methods=["POST", "DELETE"],
         detail=True,
@@ -73,8 +95,29 @@ class UserViewSet(UserViewSet):
         methods=["GET"], detail=False, permission_classes=[IsAuthenticated]
     )
     def subscriptions(self, request):
-        user = request.user
-        queryset = Follow.objects.filter(user=user)
+        recipes = limit_recipes_per_author(
+            Recipe.objects.only(
+                "id",
+                "name",
+                "image",
+                "image_processed",
+                "cooking_time",
+                "author",
+            ),
+            get_recipes_limit(request),
+        )
+        queryset = (
+            Follow.objects.filter(user=request.user)
+            .select_related("author")
+            .prefetch_related(
+                Prefetch(
+                    "author__recipes",
+                    queryset=recipes,
+                    to_attr="limited_recipes",
+                )
+            )
+            .order_by("-id")
+        )
         page_obj = self.paginate_queryset(queryset)
         serializer = FollowsSerializer(
             page_obj, many=True, context={"request": request}
@@ -82,29 +125,59 @@ class UserViewSet(UserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousCacheMixin, viewsets.ModelViewSet):
     """Вьюсет для рецептов."""
 
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsOwnerOrReadOnly,)
-    pagination_class = LimitPageNumberPagination
+    pagination_class = OptionalCursorPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Recipe.objects.all()
+        if self.action in ("favorite", "shopping_cart"):
+            return queryset.only(
+                "id", "name", "image", "image_processed", "cooking_time"
+            )
+        authors = annotate_is_subscribed(
+            User.objects.only(
+                "id", "email", "username", "first_name", "last_name"
+            ),
+            user,
+        )
+        return annotate_recipe_flags(queryset, user).prefetch_related(
+            Prefetch("author", queryset=authors),
+            "tags",
+            Prefetch(
+                "ingredient_recipe",
+                queryset=IngredientRecipe.objects.select_related("ingredient"),
+            ),
+        )
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        limit = getattr(self.request, "ingredients_limit", None)
+        if limit is not None:
+            response.data["ingredients_limit"] = limit
+        return response
+
     @action(
         methods=["POST", "DELETE"],
         detail=True,
         permission_classes=(IsAuthenticated,),
     )
     def favorite(self, request, pk):
+        recipe = self.get_object()
         if request.method == "POST":
-            return post_method(request, pk, FavoriteRecipeSerializer)
+            return post_method(request, recipe, FavoriteRecipeSerializer)
         elif request.method == "DELETE":
-            return delete_method(request, pk, Favorite)
+            return delete_method(request, recipe, Favorite)
 
     @action(
         methods=["POST", "DELETE"],
@@ -112,41 +185,67 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,),
     )
     def shopping_cart(self, request, pk):
+        recipe = self.get_object()
         if request.method == "POST":
-            return post_method(request, pk, ShopingRecipeSerializer)
+            return post_method(request, recipe, ShopingRecipeSerializer)
         elif request.method == "DELETE":
-            return delete_method(request, pk, Shopping)
+            return delete_method(request, recipe, Shopping)
+
+    @action(detail=True, methods=["GET"])
+    def similar(self, request, pk):
+        """
+        Похожие рецепты, самые похожие первыми. Соседи считаются заранее
+        командой update_similar_recipes, поэтому здесь один запрос.
+        """
+        recipes = [
+            neighbour.similar
+            for neighbour in SimilarRecipe.objects.filter(recipe_id=pk)
+            .select_related("similar")
+            .order_by("-score")
+        ]
+        if not recipes:
+            get_object_or_404(Recipe, pk=pk)
+        serializer = ShortRecipeSerializer(
+            recipes, many=True, context={"request": request}
+        )
+        return Response(serializer.data)
+
+    @action(
+        detail=False, methods=["GET"], permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Рецепты авторов из подписок, новые первыми."""
+        paginator = FeedPagination()
+        ids = paginator.paginate_ids(
+            lambda limit, before: get_feed_ids(request.user, limit, before),
+            request,
+        )
+        recipes = self.get_queryset().filter(pk__in=ids).order_by("-id")
+        serializer = self.get_serializer(recipes, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(
         detail=False, methods=["GET"], permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        user = request.user
-        ingredients = (
-            IngredientRecipe.objects.filter(recipe__shopping_cart__user=user)
-            .values(
-                "ingredient__name",
-                "ingredient__measurement_unit",
+        file_format = request.query_params.get("file_format", "txt")
+        if file_format not in RENDERERS:
+            return Response(
+                {"file_format": f"Доступные форматы: {', '.join(RENDERERS)}"},
+                status=status.HTTP_400_BAD_REQUEST,
             )
-            .annotate(value=Sum("amount"))
-            .order_by("ingredient__name")
+        content_type, render = RENDERERS[file_format]
+        response = StreamingHttpResponse(
+            render(get_shopping_list(request.user)),
+            content_type=content_type,
         )
-        response = HttpResponse(
-            charset="utf-8",
-            content_type="text/plain",
+        response["Content-Disposition"] = (
+            f'attachment; filename="shopping_list.{file_format}"'
         )
-        for ingredient in ingredients:
-            output = f"""
-            {ingredient["ingredient__name"]} - {
-                ingredient["value"]} {
-                    ingredient["ingredient__measurement_unit"]}
-            """
-            response.write(output)
-
         return response
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     "Вьюесет для ингредиентов."
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
@@ -155,11 +254,44 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (IngredientSearchFilter,)
     search_fields = ("^name",)
 
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.search, request, *args, **kwargs)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    def search(self, request, *args, **kwargs):
+        name = request.query_params.get(IngredientSearchFilter.search_param)
+        if name is None:
+            return Response(ingredient_index.all())
+        limit = request.query_params.get("limit", "")
+        limit = int(limit) if limit.isdigit() else None
+        return Response(
+            ingredient_index.search(
+                name, limit or settings.INGREDIENTS_SEARCH_LIMIT
+            )
+        )
+
+
+class TagViewSet(VersionedCacheMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
 
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
+
+
+def image_variant(request, name):
+    """Отдаёт уменьшенную копию картинки, создавая её при первом запросе."""
+    content = render_variant(name)
+    if content is None:
+        raise Http404
+    return HttpResponse(content, content_type=mimetypes.guess_type(name)[0])
+
+
+def metrics(request):
+    """Метрики запросов в текстовом формате Prometheus."""
+    if not settings.REQUEST_METRICS_ENABLED:
+        raise Http404
+    return HttpResponse(
+        registry.render(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
@@ -1,4 +1,5 @@
 import os
+from datetime import timedelta
 
 from dotenv import load_dotenv
 
@@ -21,6 +22,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "rest_framework.authtoken",
@@ -32,6 +34,7 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "api.middleware.QueryMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -113,6 +116,48 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Версии и поколения кеша, журналы изменений и ленты должны быть общими
+# для всех воркеров и команд manage.py, поэтому по умолчанию, как и база,
+# используется сервис из docker-compose. locmem годится только для
+# одного процесса: разработки и тестов.
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", default="redis")
+CACHE_BACKENDS = {
+    "locmem": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "foodgram",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "file": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.path.join(BASE_DIR, "cache"),
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "redis": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://redis:6379/1",
+    },
+    # Redis в памяти процесса для тестов, без сервера.
+    "fakeredis": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://localhost:6379/1",
+    },
+}
+CACHES = {
+    "default": {
+        **CACHE_BACKENDS[CACHE_BACKEND],
+        "KEY_PREFIX": "foodgram",
+    }
+}
+if CACHE_BACKEND == "fakeredis":
+    from fakeredis import FakeConnection
+
+    CACHES["default"]["OPTIONS"] = {
+        "CONNECTION_POOL_KWARGS": {"connection_class": FakeConnection},
+    }
+if os.getenv("CACHE_LOCATION"):
+    CACHES["default"]["LOCATION"] = os.getenv("CACHE_LOCATION")
+
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
@@ -123,3 +168,48 @@ REST_FRAMEWORK = {
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 6,
 }
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    "SHOPPING_LIST_PDF_FONT",
+    default="/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+)
+
+INGREDIENTS_SEARCH_LIMIT = 50
+
+# Сколько лучших совпадений оставляет фильтр рецептов по ингредиентам;
+# если найдено больше, в ответе есть ключ ingredients_limit.
+RECIPES_INGREDIENTS_LIMIT = 1000
+
+# Периоды полураспада веса избранного и покупок для сортировки
+# по популярности (ordering=popular и ordering=trending).
+RECIPE_POPULAR_HALF_LIFE = timedelta(days=7)
+RECIPE_TRENDING_HALF_LIFE = timedelta(days=1)
+
+# У авторов с таким числом подписчиков рецепты не копируются в ленты,
+# а добавляются в них при чтении.
+FEED_FANOUT_MAX_FOLLOWERS = int(
+    os.getenv("FEED_FANOUT_MAX_FOLLOWERS", default=1000)
+)
+
+REFERENCE_CACHE_TIMEOUT = 60 * 60 * 24
+
+ANONYMOUS_CACHE_TIMEOUT = 60 * 10
+
+IMAGE_UPLOAD_MAX_SIZE = 5 * 1024 * 1024
+# base64 раздувает картинку на треть, плюс остальные поля рецепта.
+DATA_UPLOAD_MAX_MEMORY_SIZE = IMAGE_UPLOAD_MAX_SIZE * 4 // 3 + 512 * 1024
+
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", default="JPEG")
+IMAGE_QUALITY = 85
+IMAGE_MAX_SIZE = 1600
+IMAGE_VARIANT_SIZES = (160, 320, 800)
+IMAGE_PREVIEW_SIZE = 320
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", default=2))
+
+REQUEST_METRICS_ENABLED = (
+    os.getenv("REQUEST_METRICS_ENABLED", default="False") == "True"
+)
+REQUEST_METRICS_SLOW_MS = int(os.getenv("REQUEST_METRICS_SLOW_MS", default=500))
+REQUEST_METRICS_TOP_QUERIES = 5
@@ -3,9 +3,15 @@ from django.contrib import admin
 from django.contrib.staticfiles import views
 from django.urls import include, path, re_path
 
+from api.views import image_variant, metrics
+
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/", include("api.urls")),
+    path("metrics", metrics),
+    re_path(
+        r"^media/(?P<name>recipes/images/variants/[^/]+)$", image_variant
+    ),
 ]
 
 if settings.DEBUG:
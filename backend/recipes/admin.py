@@ -36,9 +36,14 @@ class RecipeAdmin(admin.ModelAdmin):
     )
     list_filter = ("tags", "author")
 
-    @admin.display(description="В избранном")
+    def save_model(self, request, obj, form, change):
+        if "image" in form.changed_data:
+            obj.image_processed = False
+        super().save_model(request, obj, form, change)
+
+    @admin.display(description="В избранном", ordering="favorites_count")
     def favorite(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
 
 
 @admin.register(IngredientRecipe)
@@ -0,0 +1,31 @@
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.models import Recipe
+from recipes.seed import seed_dataset
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Детерминированно создаёт тестовых пользователей и рецепты '
+        'для нагрузочного тестирования.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Одинаковый seed на пустой базе даёт одинаковые данные.',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            seed_dataset(options['users'], options['recipes'], options['seed'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Пользователей: {User.objects.count()}, '
+            f'рецептов: {Recipe.objects.count()}.'
+        ))
@@ -1,21 +1,110 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management import BaseCommand
-from recipes.models import Ingredient
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import bump_version, reset_changes
+from api.ingredient_index import VERSION_NAME
+from api.recipe_ingredients_index import CHANGE_LOG_NAME
+from api.shopping_list import invalidate_shopping_list
+from recipes.models import Ingredient, IngredientRecipe, Shopping
+
+DEFAULT_PATH = os.path.join(settings.BASE_DIR, "data", "ingredients.csv")
 
 
 class Command(BaseCommand):
-    help = 'Добавляет ингредиенты из сsv файла в базу данных.'
+    help = 'Добавляет ингредиенты из csv или json файла в базу данных.'
 
-    def handle(self, *args, **options):
-        with open(
-                'data/ingredients.csv',
-                'r', encoding='utf-8'
-        ) as file:
-            reader = csv.reader(file, delimiter=',')
-            Ingredient.objects.all().delete
-            for row in reader:
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=DEFAULT_PATH,
+            help='Путь к файлу ingredients.csv или ingredients.json.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Сколько строк записывать за один запрос.',
+        )
+        parser.add_argument(
+            '--truncate',
+            action='store_true',
+            help=(
+                'Удалить все ингредиенты перед загрузкой. '
+                'Вместе с ними удалятся ингредиенты в рецептах!'
+            ),
+        )
+
+    def read_csv(self, file):
+        for row in csv.reader(file, delimiter=','):
+            if row:
                 name, unit = row
-                Ingredient.objects.get_or_create(
-                    name=name, measurement_unit=unit)
-        self.stdout.write(self.style.SUCCESS('Done!'))
+                yield name, unit
+
+    def read_json(self, file):
+        for item in json.load(file):
+            yield item['name'], item['measurement_unit']
+
+    def get_reader(self, path):
+        extension = os.path.splitext(path)[1].lower()
+        readers = {'.csv': self.read_csv, '.json': self.read_json}
+        if extension not in readers:
+            raise CommandError('Поддерживаются только файлы csv и json.')
+        return readers[extension]
+
+    def truncate(self):
+        """
+        Удаляет ингредиенты и их строки в рецептах без сигналов: иначе
+        кеш сбрасывался бы после коммита по разу на каждую строку.
+        Индекс ингредиентов рецептов и списки покупок сбрасываются один
+        раз, версия ингредиентов — вместе с загрузкой.
+        """
+        buyer_ids = list(
+            Shopping.objects.filter(recipe__ingredients__isnull=False)
+            .values_list('user_id', flat=True)
+            .distinct()
+        )
+        with connection.cursor() as cursor:
+            for model in (IngredientRecipe, Ingredient):
+                table = connection.ops.quote_name(model._meta.db_table)
+                cursor.execute(f'DELETE FROM {table}')
+
+        def reset():
+            reset_changes(CHANGE_LOG_NAME)
+            invalidate_shopping_list(*buyer_ids)
+
+        transaction.on_commit(reset)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        read = self.get_reader(path)
+        started = time.perf_counter()
+        rows = 0
+        with open(path, 'r', encoding='utf-8') as file, transaction.atomic():
+            if options['truncate']:
+                self.truncate()
+            before = Ingredient.objects.count()
+            ingredients = (
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in read(file)
+            )
+            while True:
+                batch = list(islice(ingredients, batch_size))
+                if not batch:
+                    break
+                Ingredient.objects.bulk_create(batch, ignore_conflicts=True)
+                rows += len(batch)
+            created = Ingredient.objects.count() - before
+            transaction.on_commit(lambda: bump_version(VERSION_NAME))
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Прочитано строк: {rows}, добавлено: {created}, '
+            f'{rows / elapsed:.0f} строк/с.'
+        ))
@@ -0,0 +1,77 @@
+from django.core.management import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, Shopping
+from users.models import Follow, User
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .values(field)
+            .annotate(count=Count("pk"))
+            .values("count")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает счётчики избранного, покупок, '
+        'рецептов и подписчиков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько объектов пересчитывать за один запрос.',
+        )
+
+    def reconcile(self, model, chunk_size, **counters):
+        """Пересчитывает счётчики по диапазонам первичного ключа."""
+        fixed = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:chunk_size]
+            )
+            if not pks:
+                return fixed
+            drifted = list(
+                model.objects.filter(pk__gte=pks[0], pk__lte=pks[-1])
+                .annotate(
+                    **{f'actual_{name}': value
+                       for name, value in counters.items()}
+                )
+                .exclude(**{name: F(f'actual_{name}') for name in counters})
+                .values_list('pk', flat=True)
+            )
+            if drifted:
+                model.objects.filter(pk__in=drifted).update(**counters)
+                fixed += len(drifted)
+            last_pk = pks[-1]
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        recipes = self.reconcile(
+            Recipe,
+            chunk_size,
+            favorites_count=count_related(Favorite, 'recipe'),
+            shopping_count=count_related(Shopping, 'recipe'),
+        )
+        users = self.reconcile(
+            User,
+            chunk_size,
+            recipes_count=count_related(Recipe, 'author'),
+            followers_count=count_related(Follow, 'author'),
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Исправлено рецептов: {recipes}, пользователей: {users}.'
+        ))
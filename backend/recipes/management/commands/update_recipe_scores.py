@@ -0,0 +1,135 @@
+import math
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from django.db.models import F, Max, Q
+from django.utils import timezone
+
+from api.cache import bump_generations, get_namespace
+from recipes.models import Favorite, Recipe, RecipeScore, Shopping
+
+SCORE_EPOCH = datetime(2022, 1, 1, tzinfo=dt_timezone.utc)
+# Рецепт в списке покупок скорее приготовят, чем рецепт в избранном.
+WEIGHTS = {Favorite: 1.0, Shopping: 2.0}
+
+
+def log_score(events, half_life):
+    """
+    Логарифм суммы weight * 2 ** ((время - SCORE_EPOCH) / half_life)
+    без переполнения: exp считается от разности с максимумом.
+    """
+    if not events:
+        return None
+    rate = math.log(2) / half_life.total_seconds()
+    terms = [
+        math.log(weight) + rate * (created_at - SCORE_EPOCH).total_seconds()
+        for weight, created_at in events
+    ]
+    top = max(terms)
+    return top + math.log(sum(math.exp(term - top) for term in terms))
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает популярность рецептов по избранному и спискам '
+        'покупок с экспоненциальным затуханием. Пересчитываются только '
+        'рецепты с новыми или удалёнными событиями, поэтому команду можно '
+        'запускать по расписанию.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help=(
+                'Пересчитать все рецепты, например после изменения '
+                'периодов полураспада.'
+            ),
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Сколько рецептов пересчитывать за один запрос.',
+        )
+
+    def get_changed(self, full):
+        """id рецептов, у которых изменились события."""
+        active = Q(favorites_count__gt=0) | Q(shopping_count__gt=0)
+        if full:
+            return set(
+                Recipe.objects.filter(active | Q(score__isnull=False))
+                .values_list('id', flat=True)
+            )
+        # Счётчики не совпадают с учтёнными, если события удалили или
+        # добавили в транзакции, которая закончилась после прошлого
+        # запуска.
+        changed = set(
+            Recipe.objects.filter(
+                Q(score__isnull=True) & active
+                | Q(score__isnull=False)
+                & (
+                    ~Q(favorites_count=F('score__favorites_seen'))
+                    | ~Q(shopping_count=F('score__shopping_seen'))
+                )
+            ).values_list('id', flat=True)
+        )
+        since = RecipeScore.objects.aggregate(Max('computed_at'))[
+            'computed_at__max'
+        ]
+        if since is not None:
+            for model in WEIGHTS:
+                changed.update(
+                    model.objects.filter(created_at__gte=since).values_list(
+                        'recipe_id', flat=True
+                    )
+                )
+        return changed
+
+    def compute(self, recipe_ids, computed_at):
+        events = defaultdict(list)
+        seen = defaultdict(lambda: dict.fromkeys(WEIGHTS, 0))
+        for model, weight in WEIGHTS.items():
+            rows = model.objects.filter(recipe_id__in=recipe_ids).values_list(
+                'recipe_id', 'created_at'
+            )
+            for recipe_id, created_at in rows:
+                events[recipe_id].append((weight, created_at))
+                seen[recipe_id][model] += 1
+        return [
+            RecipeScore(
+                recipe_id=recipe_id,
+                popular=log_score(
+                    recipe_events, settings.RECIPE_POPULAR_HALF_LIFE
+                ),
+                trending=log_score(
+                    recipe_events, settings.RECIPE_TRENDING_HALF_LIFE
+                ),
+                favorites_seen=seen[recipe_id][Favorite],
+                shopping_seen=seen[recipe_id][Shopping],
+                computed_at=computed_at,
+            )
+            for recipe_id, recipe_events in events.items()
+        ]
+
+    def handle(self, *args, **options):
+        # Время берётся до чтения событий: события, добавленные во время
+        # расчёта, попадут в следующий запуск.
+        computed_at = timezone.now()
+        changed = sorted(self.get_changed(options['full']))
+        chunk_size = options['chunk_size']
+        for start in range(0, len(changed), chunk_size):
+            chunk = changed[start:start + chunk_size]
+            with transaction.atomic():
+                RecipeScore.objects.filter(recipe_id__in=chunk).delete()
+                RecipeScore.objects.bulk_create(
+                    self.compute(chunk, computed_at)
+                )
+        if changed:
+            bump_generations(get_namespace(Recipe), ['scores'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Пересчитано рецептов: {len(changed)}.'
+        ))
@@ -0,0 +1,150 @@
+import heapq
+import math
+from collections import defaultdict
+from itertools import islice
+
+from django.core.management import BaseCommand
+from django.db import transaction
+
+from recipes.models import Favorite, IngredientRecipe, Recipe, SimilarRecipe
+
+BATCH_SIZE = 1000
+# Вклад каждого признака в итоговую похожесть.
+INGREDIENTS_WEIGHT = 0.5
+FAVORITES_WEIGHT = 0.3
+TAGS_WEIGHT = 0.2
+# Признаки, которые есть больше чем у такой доли рецептов (соль, вода),
+# почти ничего не говорят о похожести, а число пар растёт квадратично.
+# В небольшом каталоге доля — несколько рецептов, и отсеялись бы все
+# признаки, поэтому частыми считаются только признаки больше чем
+# у MIN_FEATURE_COUNT рецептов.
+MAX_FEATURE_SHARE = 0.2
+MIN_FEATURE_COUNT = 50
+
+
+def normalize(vectors):
+    """Приводит разреженные векторы {признак: вес} к единичной длине."""
+    for vector in vectors.values():
+        norm = math.sqrt(sum(weight * weight for weight in vector.values()))
+        for feature in vector:
+            vector[feature] /= norm
+
+
+def build_postings(vectors, max_count):
+    """Обратный индекс {признак: [(рецепт, вес)]} без частых признаков."""
+    postings = defaultdict(list)
+    for recipe_id, vector in vectors.items():
+        for feature, weight in vector.items():
+            postings[feature].append((recipe_id, weight))
+    return {
+        feature: recipes
+        for feature, recipes in postings.items()
+        if len(recipes) <= max_count
+    }
+
+
+def cosine(vector, postings, recipe_id):
+    """
+    Косинусная похожесть рецепта со всеми рецептами, у которых есть
+    общие признаки: строка произведения разреженных матриц X * X^T.
+    """
+    scores = defaultdict(float)
+    for feature, weight in vector.items():
+        for other_id, other_weight in postings.get(feature, ()):
+            if other_id != recipe_id:
+                scores[other_id] += weight * other_weight
+    return scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Находит для каждого рецепта самые похожие по ингредиентам, тегам '
+        'и избранному и сохраняет их для /api/recipes/{id}/similar/.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Сколько похожих рецептов сохранять для каждого рецепта.',
+        )
+
+    def load_vectors(self, total):
+        """Векторы ингредиентов (с весом idf), избранного и теги."""
+        ingredients = defaultdict(dict)
+        for recipe_id, ingredient_id in IngredientRecipe.objects.values_list(
+            'recipe_id', 'ingredient_id'
+        ).iterator():
+            ingredients[recipe_id][ingredient_id] = 1.0
+        frequency = defaultdict(int)
+        for vector in ingredients.values():
+            for ingredient_id in vector:
+                frequency[ingredient_id] += 1
+        for vector in ingredients.values():
+            for ingredient_id in vector:
+                vector[ingredient_id] = math.log(
+                    total / frequency[ingredient_id]
+                ) + 1
+        favorites = defaultdict(dict)
+        for recipe_id, user_id in Favorite.objects.values_list(
+            'recipe_id', 'user_id'
+        ).iterator():
+            favorites[recipe_id][user_id] = 1.0
+        tags = defaultdict(set)
+        for recipe_id, tag_id in Recipe.tags.through.objects.values_list(
+            'recipe_id', 'tag_id'
+        ).iterator():
+            tags[recipe_id].add(tag_id)
+        normalize(ingredients)
+        normalize(favorites)
+        return ingredients, favorites, tags
+
+    def get_neighbours(self, top):
+        total = Recipe.objects.count()
+        ingredients, favorites, tags = self.load_vectors(total)
+        max_count = max(int(total * MAX_FEATURE_SHARE), MIN_FEATURE_COUNT)
+        ingredient_postings = build_postings(ingredients, max_count)
+        favorite_postings = build_postings(favorites, max_count)
+        for recipe_id in Recipe.objects.values_list('id', flat=True):
+            scores = defaultdict(float)
+            for vectors, postings, weight in (
+                (ingredients, ingredient_postings, INGREDIENTS_WEIGHT),
+                (favorites, favorite_postings, FAVORITES_WEIGHT),
+            ):
+                similar = cosine(
+                    vectors.get(recipe_id, {}), postings, recipe_id
+                )
+                for other_id, value in similar.items():
+                    scores[other_id] += weight * value
+            # Теги есть почти у всех рецептов, поэтому они не ищут
+            # кандидатов, а только уточняют похожесть найденных: рецепты
+            # только с общими тегами похожими не считаются.
+            recipe_tags = tags.get(recipe_id, set())
+            for other_id in scores:
+                other_tags = tags.get(other_id)
+                if recipe_tags and other_tags:
+                    scores[other_id] += TAGS_WEIGHT * len(
+                        recipe_tags & other_tags
+                    ) / math.sqrt(len(recipe_tags) * len(other_tags))
+            for other_id in heapq.nlargest(top, scores, key=scores.get):
+                yield SimilarRecipe(
+                    recipe_id=recipe_id,
+                    similar_id=other_id,
+                    score=scores[other_id],
+                )
+
+    def handle(self, *args, **options):
+        neighbours = self.get_neighbours(options['top'])
+        created = 0
+        with transaction.atomic():
+            SimilarRecipe.objects.all().delete()
+            while True:
+                batch = list(islice(neighbours, BATCH_SIZE))
+                if not batch:
+                    break
+                SimilarRecipe.objects.bulk_create(batch)
+                created += len(batch)
+        self.stdout.write(self.style.SUCCESS(
+            f'Done! Сохранено похожих рецептов: {created}.'
+        ))
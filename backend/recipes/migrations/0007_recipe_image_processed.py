@@ -0,0 +1,18 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_ordering_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_processed',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Картинка обработана'),
+        ),
+    ]
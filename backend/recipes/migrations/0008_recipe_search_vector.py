@@ -0,0 +1,79 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:16
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_INDEXES = (
+    django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='recipe_search_vector_idx'),
+    django.contrib.postgres.indexes.GinIndex(fields=['name'], name='recipe_name_trgm_idx', opclasses=('gin_trgm_ops',)),
+)
+
+# Название весит больше описания: setweight A и B для ts_rank.
+CREATE_TRIGGER = '''
+CREATE FUNCTION recipes_recipe_search_vector() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('russian', coalesce(NEW.name, '')), 'A') ||
+        setweight(to_tsvector('russian', coalesce(NEW.text, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER recipes_recipe_search_vector
+BEFORE INSERT OR UPDATE OF name, text ON recipes_recipe
+FOR EACH ROW EXECUTE FUNCTION recipes_recipe_search_vector();
+
+UPDATE recipes_recipe SET name = name;
+'''
+
+DROP_TRIGGER = '''
+DROP TRIGGER recipes_recipe_search_vector ON recipes_recipe;
+DROP FUNCTION recipes_recipe_search_vector();
+'''
+
+
+def create_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    schema_editor.execute(CREATE_TRIGGER)
+    for index in SEARCH_INDEXES:
+        schema_editor.add_index(Recipe, index)
+
+
+def drop_search(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Recipe = apps.get_model('recipes', 'Recipe')
+    for index in SEARCH_INDEXES:
+        schema_editor.remove_index(Recipe, index)
+    schema_editor.execute(DROP_TRIGGER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_processed'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # GIN-индексы и триггер есть только в PostgreSQL, в SQLite
+        # поиск идёт по индексу в памяти (api.recipe_index).
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='recipe', index=index)
+                for index in SEARCH_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_search, drop_search),
+            ],
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:23
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_timeline'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeScore',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='score', serialize=False, to='recipes.recipe', verbose_name='Рецепт')),
+                ('popular', models.FloatField(db_index=True, verbose_name='Популярность')),
+                ('trending', models.FloatField(db_index=True, verbose_name='Популярность сейчас')),
+                ('favorites_seen', models.PositiveIntegerField(verbose_name='Учтено избранного')),
+                ('shopping_seen', models.PositiveIntegerField(verbose_name='Учтено покупок')),
+                ('computed_at', models.DateTimeField(db_index=True, verbose_name='Дата расчёта')),
+            ],
+            options={
+                'verbose_name': 'Популярность рецепта',
+                'verbose_name_plural': 'Популярность рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата публикации'),
+        ),
+        migrations.AddField(
+            model_name='shopping',
+            name='created_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+        ),
+    ]
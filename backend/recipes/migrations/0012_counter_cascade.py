@@ -0,0 +1,31 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0011_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='favorite',
+            name='recipe',
+            field=models.ForeignKey(on_delete=users.models.cascade_counter, related_name='favorite', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AlterField(
+            model_name='recipe',
+            name='author',
+            field=models.ForeignKey(on_delete=users.models.cascade_counter, related_name='recipes', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+        migrations.AlterField(
+            model_name='shopping',
+            name='recipe',
+            field=models.ForeignKey(on_delete=users.models.cascade_counter, related_name='shopping_cart', to='recipes.recipe', verbose_name='Рецепт'),
+        ),
+    ]
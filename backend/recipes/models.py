@@ -1,7 +1,10 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
-from users.models import User
+from users.models import CountersMixin, User, cascade_counter
 
 
 class Tag(models.Model):
@@ -26,17 +29,23 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=("name", "measurement_unit"),
+                name="unique_ingredient",
+            )
+        ]
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class Recipe(CountersMixin, models.Model):
     "Модель рецепта."
     author = models.ForeignKey(
         User,
         related_name="recipes",
-        on_delete=models.CASCADE,
+        on_delete=cascade_counter,
         verbose_name="Автор",
     )
     ingredients = models.ManyToManyField(
@@ -62,10 +71,42 @@ class Recipe(models.Model):
         upload_to="recipes/images/",
         verbose_name="Изоображение",
     )
+    image_processed = models.BooleanField(
+        "Картинка обработана", default=False, editable=False
+    )
+    favorites_count = models.PositiveIntegerField(
+        "В избранном", default=0, editable=False
+    )
+    shopping_count = models.PositiveIntegerField(
+        "В списках покупок", default=0, editable=False
+    )
+    created_at = models.DateTimeField(
+        "Дата публикации", default=timezone.now, db_index=True
+    )
+    # Заполняется триггером PostgreSQL из названия и описания.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    counter_fields = ("favorites_count", "shopping_count")
+    # Обработанную картинку записывает api.images.process_recipe_image.
+    background_fields = ("image", "image_processed")
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=("author", "-id"), name="recipe_author_id_idx"
+            ),
+            GinIndex(
+                fields=("search_vector",), name="recipe_search_vector_idx"
+            ),
+            GinIndex(
+                fields=("name",),
+                name="recipe_name_trgm_idx",
+                opclasses=("gin_trgm_ops",),
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -116,13 +157,22 @@ class Favorite(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         related_name="favorite",
-        on_delete=models.CASCADE,
+        on_delete=cascade_counter,
         verbose_name="Рецепт",
     )
 
+    created_at = models.DateTimeField(
+        "Дата добавления", default=timezone.now, db_index=True
+    )
+
     class Meta:
         verbose_name = "Добавлен в избранное"
         verbose_name_plural = "Добавлены в избранное"
+        indexes = [
+            models.Index(
+                fields=("recipe", "user"), name="favorite_recipe_user_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("user", "recipe"), name="unique_favorites"
@@ -144,13 +194,22 @@ class Shopping(models.Model):
     recipe = models.ForeignKey(
         Recipe,
         related_name="shopping_cart",
-        on_delete=models.CASCADE,
+        on_delete=cascade_counter,
         verbose_name="Рецепт",
     )
 
+    created_at = models.DateTimeField(
+        "Дата добавления", default=timezone.now, db_index=True
+    )
+
     class Meta:
         verbose_name = "Добавлен в список покупок"
         verbose_name_plural = "Добавлены в список покупок"
+        indexes = [
+            models.Index(
+                fields=("recipe", "user"), name="shopping_recipe_user_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=("user", "recipe"), name="unique_shopping"
@@ -161,3 +220,118 @@ class Shopping(models.Model):
         return f""" Рецепт «{self.recipe}» добавлен
         в список покупок {self.user}
         """
+
+
+class RecipeScore(models.Model):
+    """
+    Популярность рецепта по избранному и спискам покупок, которую
+    пересчитывает команда update_recipe_scores.
+
+    Оценки хранятся как логарифм суммы весов событий, умноженных на
+    2 ** ((время события - SCORE_EPOCH) / период полураспада), где
+    SCORE_EPOCH — фиксированная дата. Порядок рецептов по такой оценке
+    совпадает с порядком по сумме, затухающей со временем, поэтому
+    оценку нужно пересчитывать только у рецептов, где изменились
+    события.
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        primary_key=True,
+        related_name="score",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    popular = models.FloatField("Популярность", db_index=True)
+    trending = models.FloatField("Популярность сейчас", db_index=True)
+    favorites_seen = models.PositiveIntegerField("Учтено избранного")
+    shopping_seen = models.PositiveIntegerField("Учтено покупок")
+    computed_at = models.DateTimeField("Дата расчёта", db_index=True)
+
+    class Meta:
+        verbose_name = "Популярность рецепта"
+        verbose_name_plural = "Популярность рецептов"
+
+    def __str__(self):
+        return f"Популярность рецепта {self.recipe_id}"
+
+
+class SimilarRecipe(models.Model):
+    """
+    Похожий рецепт: общие ингредиенты, теги и пользователи, добавившие
+    оба рецепта в избранное. Заполняется командой update_similar_recipes.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="similar",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField("Похожесть")
+
+    class Meta:
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        indexes = [
+            models.Index(
+                fields=("recipe", "-score"), name="similar_recipe_score_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("recipe", "similar"), name="unique_similar_recipe"
+            )
+        ]
+
+    def __str__(self):
+        return f"Рецепт {self.similar_id} похож на {self.recipe_id}"
+
+
+class TimelineEntry(models.Model):
+    """
+    Рецепт в ленте подписчика. Записи создаются при публикации рецепта
+    и при подписке, лента читается одним запросом по индексу.
+    """
+
+    user = models.ForeignKey(
+        User,
+        related_name="timeline",
+        on_delete=models.CASCADE,
+        verbose_name="Подписчик",
+    )
+    author = models.ForeignKey(
+        User,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Автор",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        related_name="+",
+        on_delete=models.CASCADE,
+        verbose_name="Рецепт",
+    )
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        indexes = [
+            models.Index(
+                fields=("user", "author"), name="timeline_user_author_idx"
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_timeline_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"Рецепт «{self.recipe_id}» в ленте {self.user_id}"
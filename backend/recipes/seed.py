@@ -0,0 +1,156 @@
+import base64
+import random
+from datetime import timedelta
+from io import BytesIO, StringIO
+
+from django.core.management import call_command
+from django.utils import timezone
+from PIL import Image
+
+from users.models import Follow, User
+
+from .models import (
+    Favorite,
+    Ingredient,
+    IngredientRecipe,
+    Recipe,
+    Shopping,
+    Tag,
+)
+
+SEED_PREFIX = "seed"
+BATCH_SIZE = 1000
+# За сколько дней до запуска распределены рецепты, избранное и покупки.
+SEED_DAYS = 30
+
+
+def get_image():
+    """Маленькая картинка в base64 для запросов на создание рецепта."""
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), "white").save(buffer, "PNG")
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/png;base64,{encoded}"
+
+
+def seed_dataset(users=100, recipes=1000, seed=0):
+    """
+    Детерминированно заполняет базу тестовыми данными: пользователи,
+    теги, рецепты с 5–15 ингредиентами, подписки, избранное и покупки.
+    Даты отсчитываются от момента запуска.
+    """
+    rng = random.Random(seed)
+    # Отдельный генератор, чтобы даты не меняли остальные данные.
+    dates = random.Random(seed)
+    now = timezone.now()
+
+    def random_date():
+        return now - timedelta(seconds=dates.randrange(SEED_DAYS * 86400))
+    tags = [
+        Tag.objects.get_or_create(
+            slug=f"{SEED_PREFIX}-{index}",
+            defaults={
+                "name": f"{SEED_PREFIX} {index}",
+                "color": f"#5EED0{index}",
+            },
+        )[0]
+        for index in range(5)
+    ]
+    ingredients = list(Ingredient.objects.values_list("id", flat=True))
+    if len(ingredients) < 15:
+        Ingredient.objects.bulk_create(
+            [
+                Ingredient(name=f"{SEED_PREFIX} {index}", measurement_unit="г")
+                for index in range(200)
+            ],
+            ignore_conflicts=True,
+        )
+        ingredients = list(Ingredient.objects.values_list("id", flat=True))
+
+    last_user_id = (
+        User.objects.order_by("-id").values_list("id", flat=True).first()
+    )
+    start = (last_user_id or 0) + 1
+    User.objects.bulk_create(
+        [
+            User(
+                username=f"{SEED_PREFIX}{start + index}",
+                email=f"{SEED_PREFIX}{start + index}@example.com",
+                first_name="Seed",
+                last_name=str(start + index),
+                password="!",
+            )
+            for index in range(users)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(
+        User.objects.filter(username__startswith=SEED_PREFIX)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    new_user_ids = user_ids[len(user_ids) - users:]
+
+    Recipe.objects.bulk_create(
+        [
+            Recipe(
+                author_id=rng.choice(user_ids),
+                name=f"Рецепт {index}",
+                text=f"Описание рецепта {index}",
+                cooking_time=rng.randint(1, 120),
+                image=f"recipes/images/{SEED_PREFIX}.png",
+                created_at=now - timedelta(
+                    seconds=SEED_DAYS * 86400 * (recipes - index) // recipes
+                ),
+            )
+            for index in range(recipes)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    recipe_ids = list(
+        Recipe.objects.filter(image=f"recipes/images/{SEED_PREFIX}.png")
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    new_recipe_ids = recipe_ids[len(recipe_ids) - recipes:]
+
+    Recipe.tags.through.objects.bulk_create(
+        [
+            Recipe.tags.through(recipe_id=recipe_id, tag_id=tag.id)
+            for recipe_id in new_recipe_ids
+            for tag in rng.sample(tags, rng.randint(1, 3))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    IngredientRecipe.objects.bulk_create(
+        [
+            IngredientRecipe(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500),
+            )
+            for recipe_id in new_recipe_ids
+            for ingredient_id in rng.sample(ingredients, rng.randint(5, 15))
+        ],
+        batch_size=BATCH_SIZE,
+    )
+
+    for model, targets, field, per_user in (
+        (Follow, user_ids, "author_id", 10),
+        (Favorite, recipe_ids, "recipe_id", 20),
+        (Shopping, recipe_ids, "recipe_id", 5),
+    ):
+        objects = [
+            model(user_id=user_id, **{field: target})
+            for user_id in new_user_ids
+            for target in rng.sample(targets, min(per_user, len(targets)))
+            if target != user_id or model is not Follow
+        ]
+        if model is not Follow:
+            for obj in objects:
+                obj.created_at = random_date()
+        model.objects.bulk_create(
+            objects, batch_size=BATCH_SIZE, ignore_conflicts=True
+        )
+    call_command("reconcile_counters", stdout=StringIO())
+    call_command("rebuild_timelines", stdout=StringIO())
+    call_command("update_similar_recipes", stdout=StringIO())
@@ -8,6 +8,8 @@ class UserAdmin(admin.ModelAdmin):
     list_display = (
         "username",
         "email",
+        "recipes_count",
+        "followers_count",
     )
 
 
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.15 on 2026-10-18 18:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_counters'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'ordering': ('-id',), 'verbose_name': 'Подписчик', 'verbose_name_plural': 'Подписчики'},
+        ),
+        migrations.AlterModelOptions(
+            name='user',
+            options={'ordering': ('id',), 'verbose_name': 'Пользователь', 'verbose_name_plural': 'Пользователи'},
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+    ]
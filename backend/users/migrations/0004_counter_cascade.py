@@ -0,0 +1,20 @@
+# Generated by Django 3.2.15 on 2026-10-18 19:36
+
+from django.conf import settings
+from django.db import migrations, models
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_ordering_and_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='follow',
+            name='author',
+            field=models.ForeignKey(on_delete=users.models.cascade_counter, related_name='following', to=settings.AUTH_USER_MODEL, verbose_name='Автор'),
+        ),
+    ]
@@ -2,12 +2,87 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 
-class User(AbstractUser):
+def cascade_counter(collector, field, sub_objs, using):
+    """
+    CASCADE для связей, по которым ведутся счётчики. Удаляемые вместе
+    с объектом строки помечаются parent_deleted, чтобы сигналы не
+    уменьшали счётчик объекта, который удаляется сам.
+    """
+    for obj in sub_objs:
+        obj.parent_deleted = True
+    models.CASCADE(collector, field, sub_objs, using)
+
+
+class CountersMixin:
+    """
+    Счётчики меняются только через UPDATE с F() в сигналах. save()
+    загруженного объекта не записывает их, если их не указали в
+    update_fields: иначе он затрёт значения, изменённые после чтения.
+
+    Поля background_fields меняет фоновая задача тоже через UPDATE.
+    save() без update_fields записывает их, только если их изменили
+    после загрузки объекта.
+    """
+
+    counter_fields = ()
+    background_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_background = instance.get_background_values()
+        return instance
+
+    def get_background_values(self):
+        deferred = self.get_deferred_fields()
+        values = {}
+        for name in self.background_fields:
+            field = self._meta.get_field(name)
+            if field.attname not in deferred:
+                values[name] = field.get_prep_value(
+                    field.value_from_object(self)
+                )
+        return values
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and kwargs.get("update_fields") is None
+            and not kwargs.get("force_insert")
+        ):
+            deferred = self.get_deferred_fields()
+            loaded = getattr(self, "_loaded_background", {})
+            unchanged = {
+                name
+                for name, value in self.get_background_values().items()
+                if name in loaded and loaded[name] == value
+            }
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+                and field.name not in unchanged
+                and field.attname not in deferred
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_background = self.get_background_values()
+
+
+class User(CountersMixin, AbstractUser):
     """Кастомная модель пользователя."""
     username = models.CharField("Ник", max_length=150, unique=True)
     email = models.EmailField("Электронная почта", max_length=50, unique=True)
     first_name = models.CharField("Имя", max_length=50)
     last_name = models.CharField("Фамилия", max_length=50)
+    recipes_count = models.PositiveIntegerField(
+        "Рецептов", default=0, editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        "Подписчиков", default=0, editable=False
+    )
+
+    counter_fields = ("recipes_count", "followers_count")
 
     USERNAME_FIELD = "email"
 
@@ -16,6 +91,7 @@ class User(AbstractUser):
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        ordering = ("id",)
 
     def __str__(self):
         return self.username
@@ -33,13 +109,19 @@ class Follow(models.Model):
     author = models.ForeignKey(
         User,
         related_name="following",
-        on_delete=models.CASCADE,
+        on_delete=cascade_counter,
         verbose_name="Автор",
     )
 
     class Meta:
         verbose_name = "Подписчик"
         verbose_name_plural = "Подписчики"
+        ordering = ("-id",)
+        indexes = [
+            models.Index(
+                fields=("author", "user"), name="follow_author_user_idx"
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=["user", "author"],